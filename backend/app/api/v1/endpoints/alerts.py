@@ -5,7 +5,13 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.api.deps import get_db
-from app.schemas.alert import AlertCreate, AlertUpdate, AlertResponse
+from app.schemas.alert import (
+    AlertCreate,
+    AlertUpdate,
+    AlertResponse,
+    AlertSimulationRequest,
+    AlertSimulationResponse,
+)
 
 router = APIRouter()
 
@@ -161,33 +167,33 @@ def get_alerts_summary(
     """
     Obtenir un résumé des alertes pour le tableau de bord
     """
-    # TODO: Implement actual alert summary logic
-    # from app.services.alert_service import AlertService
-    # 
-    # alert_service = AlertService(db)
-    # summary = alert_service.get_alerts_summary()
-    # return summary
+    from app.services.alert_service import AlertService
     
-    return {
-        "total": 0,
-        "by_severity": {
-            "RED": 0,
-            "ORANGE": 0,
-            "GREEN": 0
-        },
-        "by_status": {
-            "PENDING": 0,
-            "ACKNOWLEDGED": 0,
-            "RESOLVED": 0
-        },
-        "by_type": {
-            "VALIDITY_WARNING": 0,
-            "VALIDITY_CRITICAL": 0,
-            "WORK_DELAY_WARNING": 0,
-            "REPAYMENT_UPCOMING": 0,
-            "REPAYMENT_IMMINENT": 0
-        }
-    }
+    alert_service = AlertService(db)
+    return alert_service.get_alerts_summary()
+
+@router.post("/simulate", response_model=AlertSimulationResponse)
+def simulate_alerts(
+    simulation: AlertSimulationRequest,
+    db: Session = Depends(get_db),
+):
+    """
+    Simuler les alertes qu'un jeu de seuils générerait sur les prochains jours
+    (aucune alerte n'est créée)
+    """
+    from app.services.alert_simulation import AlertSimulationService
+    
+    try:
+        return AlertSimulationService(db).simulate(
+            simulation.horizon_days,
+            simulation.overrides,
+            simulation.include_open
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.post("/check")
 def check_all_alerts(
@@ -3,11 +3,19 @@
 # backend/app/api/v1/endpoints/loans.py
 # ============================
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import os
+import shutil
+import uuid
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
 from sqlalchemy.orm import Session
 from app.api.deps import get_current_user, get_db
 from app.models import User, Loan, Client
-from app.schemas.loan import LoanCreate, LoanUpdate, LoanResponse, LoanWithDetails
+from app.schemas.loan import (
+    LoanCreate, LoanUpdate, LoanResponse, LoanWithDetails, RepaymentScheduleResponse,
+    LoanSimulationRequest, LoanSimulationResponse, LoanImportJob
+)
+from app.config import settings
+from app.services.loan_import import IMPORT_FORMATS
 from app.services.loan_service import LoanService
 
 router = APIRouter()
@@ -55,11 +63,72 @@ def create_loan(
         )
     
     loan_service = LoanService(db)
-    loan = loan_service.create_loan(loan_data.dict())
+    loan = loan_service.create_loan(loan_data.dict(), agency_code=current_user.agency_code)
     
     return loan
 
 
+@router.post("/simulate", response_model=LoanSimulationResponse)
+def simulate_loans(
+    request: LoanSimulationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Simuler des prêts (mensualité, coût total, fin de validité) sans les créer
+    """
+    loan_service = LoanService(db)
+    return loan_service.simulate_loans([scenario.dict() for scenario in request.scenarios])
+
+
+@router.post("/import", response_model=LoanImportJob, status_code=status.HTTP_202_ACCEPTED)
+def import_loans(
+    file: UploadFile = File(...),
+    agency_code: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Importer des prêts depuis un fichier CSV ou Excel (tâche asynchrone)
+    """
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Format de fichier non supporté (attendu: {', '.join(IMPORT_FORMATS)})"
+        )
+    
+    # The file is read by the worker from the shared uploads volume
+    os.makedirs(settings.LOAN_IMPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.LOAN_IMPORT_DIR, f"{uuid.uuid4().hex}{extension}")
+    with open(path, "wb") as destination:
+        shutil.copyfileobj(file.file, destination)
+    
+    from app.tasks import import_loans as import_loans_task
+    task = import_loans_task.delay(path, agency_code or current_user.agency_code)
+    return {"job_id": task.id, "status": task.status}
+
+
+@router.get("/import/{job_id}", response_model=LoanImportJob)
+def get_import_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Suivre un import de prêts: progression, puis rapport et erreurs par ligne
+    """
+    from app.core.celery_app import celery_app
+    
+    result = celery_app.AsyncResult(job_id)
+    job = {"job_id": job_id, "status": result.state}
+    if result.state == "PROGRESS":
+        job["progress"] = result.info
+    elif result.state == "SUCCESS":
+        job["report"] = result.result
+    elif result.state == "FAILURE":
+        job["error"] = str(result.result)
+    return job
+
+
 @router.get("/{loan_id}", response_model=LoanWithDetails)
 def get_loan(
     loan_id: int,
@@ -80,6 +149,27 @@ def get_loan(
     return loan
 
 
+@router.get("/{loan_id}/schedule", response_model=RepaymentScheduleResponse)
+def get_loan_schedule(
+    loan_id: int,
+    exact: bool = Query(False, description="Montants exacts (Decimal) au lieu de l'aperçu"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Récupérer le tableau d'amortissement d'un prêt
+    """
+    loan = db.query(Loan).filter(Loan.id == loan_id).first()
+    
+    if not loan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Loan not found"
+        )
+    
+    return LoanService(db).get_repayment_schedule(loan, exact=exact)
+
+
 @router.put("/{loan_id}", response_model=LoanResponse)
 def update_loan(
     loan_id: int,
@@ -98,13 +188,9 @@ def update_loan(
             detail="Loan not found"
         )
     
-    # Update loan fields
-    update_data = loan_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(loan, field, value)
-    
-    db.commit()
-    db.refresh(loan)
+    # Update loan fields (schedule recomputed for this loan if needed)
+    loan_service = LoanService(db)
+    loan = loan_service.update_loan(loan, loan_update.dict(exclude_unset=True))
     
     return loan
 
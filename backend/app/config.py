@@ -2,7 +2,7 @@
 # backend/app/config.py
 # ============================
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pathlib import Path
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl, validator
@@ -75,11 +75,88 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[str] = None
     EMAILS_FROM_NAME: Optional[str] = "CFC Déblocages"
+    # Persistent SMTP connections kept by each worker process
+    SMTP_POOL_SIZE: int = 5
+    SMTP_TIMEOUT: int = 30
+
+    # SMS
+    # Bulk provider: "log" (no provider configured) or "fake" (in-memory, tests)
+    SMS_PROVIDER: str = "log"
+    # Alerts for the same phone number within this window are sent as one SMS
+    SMS_COALESCE_WINDOW_SECONDS: int = 60
+    # Maximum billable segments of a coalesced SMS (153 GSM-7 or 67 UCS-2 characters
+    # per part; the severity emoji make alert SMS UCS-2)
+    SMS_MAX_SEGMENTS: int = 3
+    # Messages per provider bulk request
+    SMS_BULK_SIZE: int = 100
+    # Phone numbers flushed per beat tick
+    SMS_FLUSH_LIMIT: int = 1000
 
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
 
+    # Loans
+    # Agency segment of new loan numbers (YYYY/AGENCY/SEQUENCE/TYPE)
+    LOAN_AGENCY_CODE: str = "102"
+    # Bulk import: rows per transaction, errors kept in the job report, uploaded files
+    LOAN_IMPORT_CHUNK_SIZE: int = 1000
+    LOAN_IMPORT_MAX_ERRORS: int = 1000
+    LOAN_IMPORT_DIR: str = "uploads/imports"
+
+    # Alerts
+    # "set": one INSERT ... SELECT per rule, "memory": vectorised evaluation of streamed batches
+    ALERT_EVALUATION_MODE: str = "set"
+    # Only rescan loans whose next threshold date has passed or that changed since the last run
+    ALERT_INCREMENTAL_SCAN: bool = True
+    # Changes are looked up from the watermark minus this overlap: updated_at is the
+    # start time of the writing transaction, which may commit after a scan has read
+    ALERT_SCAN_WATERMARK_OVERLAP_SECONDS: int = 600
+    # Number of parallel sub-tasks for the set-based scan (1: single task)
+    ALERT_SCAN_SHARDS: int = 1
+    # Hours before an unacknowledged alert is escalated, by severity
+    ALERT_ESCALATION_HOURS: Dict[str, int] = {"RED": 4, "ORANGE": 48}
+    # Hours before an acknowledged but unresolved alert is escalated
+    ALERT_ESCALATION_ACKNOWLEDGED_HOURS: int = 72
+    # Maximum number of due escalations handled per beat tick
+    ALERT_ESCALATION_BATCH_SIZE: int = 500
+    # Admin notifications are buffered and sent as one digest per agency
+    ALERT_DIGEST_WINDOW_MINUTES: int = 15
+    # Flush an agency's digest early once this many items are buffered
+    ALERT_DIGEST_MAX_ITEMS: int = 500
+    # Recipient of digests for agencies without an active admin or director
+    ALERT_DIGEST_FALLBACK_EMAIL: str = "admin@cfc-deblocages.com"
+
+    # Notification outbox
+    NOTIFICATION_OUTBOX_POLL_SECONDS: int = 10
+    NOTIFICATION_OUTBOX_BATCH_SIZE: int = 200
+    # Batches claimed by one dispatcher run before it yields to the next beat tick
+    NOTIFICATION_OUTBOX_MAX_BATCHES: int = 50
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS: int = 5
+    # Items per channel task (email, sms, push)
+    NOTIFICATION_CHANNEL_BATCH_SIZE: int = 50
+    # Broker priority by alert severity (Redis transport: 0 is the highest)
+    NOTIFICATION_PRIORITIES: Dict[str, int] = {"RED": 0, "ORANGE": 3}
+    # Channel task executions per worker (Celery rate_limit syntax)
+    NOTIFICATION_RATE_LIMITS: Dict[str, str] = {"email": "20/s", "sms": "5/s", "push": "50/s"}
+    # Lifetime of the Redis key guarding each (alert, channel) send against duplicates
+    NOTIFICATION_DEDUP_TTL_SECONDS: int = 3600
+    # Notification task retries, with exponential backoff capped at the given delay
+    NOTIFICATION_TASK_MAX_RETRIES: int = 5
+    NOTIFICATION_TASK_RETRY_BACKOFF_MAX: int = 600
+    # Failed email/SMS deliveries are re-sent every interval, for alerts between
+    # the minimum age (first attempt finished) and the maximum age
+    NOTIFICATION_RETRY_INTERVAL_MINUTES: int = 15
+    NOTIFICATION_RETRY_MIN_AGE_MINUTES: int = 10
+    NOTIFICATION_RETRY_MAX_AGE_HOURS: int = 6
+    NOTIFICATION_RETRY_BATCH_SIZE: int = 500
+    # Channels of clients who have not saved any preference
+    NOTIFICATION_DEFAULT_PREFERENCES: Dict[str, bool] = {"email": True, "sms": True, "push": True}
+    # Preferences cache: per-process LRU in front of a Redis hash per client
+    NOTIFICATION_PREFERENCES_CACHE_SIZE: int = 10000
+    NOTIFICATION_PREFERENCES_LOCAL_TTL_SECONDS: int = 60
+    NOTIFICATION_PREFERENCES_REDIS_TTL_SECONDS: int = 86400
+
     # i18n
     DEFAULT_LANGUAGE: str = "fr"
     SUPPORTED_LANGUAGES: List[str] = ["fr", "en"]
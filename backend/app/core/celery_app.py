@@ -4,8 +4,10 @@
 import os
 from pathlib import Path
 from celery import Celery
+from celery.signals import worker_process_init
 from celery.schedules import crontab
 from urllib.parse import quote_plus
+from app.config import settings
 
 def get_secret(secret_name: str, default: str = None) -> str:
     """Get secret from Docker secrets file or environment variable."""
@@ -58,11 +60,66 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='Africa/Douala',
     enable_utc=True,
+    # One queue per workload so that a slow channel cannot starve the others
+    task_routes={
+        'app.tasks.check_all_alerts': {'queue': 'scan'},
+        'app.tasks.check_alerts_shard': {'queue': 'scan'},
+        'app.tasks.aggregate_alert_shards': {'queue': 'scan'},
+        'app.tasks.dispatch_notification_outbox': {'queue': 'dispatch'},
+        'app.tasks.escalate_due_alerts': {'queue': 'dispatch'},
+        'app.tasks.retry_failed_notifications': {'queue': 'dispatch'},
+        'app.tasks.send_alert_notifications': {'queue': 'dispatch'},
+        'app.tasks.send_alert_notifications_batch': {'queue': 'dispatch'},
+        'app.tasks.send_email_batch': {'queue': 'email'},
+        'app.tasks.flush_alert_digest': {'queue': 'email'},
+        'app.tasks.send_sms_batch': {'queue': 'sms'},
+        'app.tasks.flush_sms': {'queue': 'sms'},
+        'app.tasks.send_push_batch': {'queue': 'push'},
+        'app.tasks.import_loans': {'queue': 'reports'},
+        'app.tasks.send_daily_report': {'queue': 'reports'},
+        'app.tasks.cleanup_old_alerts': {'queue': 'reports'},
+    },
+    task_annotations={
+        f'app.tasks.send_{channel}_batch': {'rate_limit': rate_limit}
+        for channel, rate_limit in settings.NOTIFICATION_RATE_LIMITS.items()
+    },
+    # Acknowledge after execution and only reserve one task at a time: notification
+    # tasks are idempotent (deduplicated sends). Non-idempotent tasks such as
+    # import_loans opt out with acks_late=False on the task itself.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    # Priorities on the Redis transport (RED alerts before ORANGE ones)
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
     beat_schedule={
         'check-alerts-every-hour': {
             'task': 'app.tasks.check_all_alerts',
             'schedule': crontab(minute=0),  # Every hour
         },
+        'escalate-due-alerts': {
+            'task': 'app.tasks.escalate_due_alerts',
+            'schedule': crontab(),  # Every minute
+        },
+        'dispatch-notification-outbox': {
+            'task': 'app.tasks.dispatch_notification_outbox',
+            'schedule': settings.NOTIFICATION_OUTBOX_POLL_SECONDS,
+        },
+        'retry-failed-notifications': {
+            'task': 'app.tasks.retry_failed_notifications',
+            'schedule': settings.NOTIFICATION_RETRY_INTERVAL_MINUTES * 60,
+        },
+        'flush-alert-digest': {
+            'task': 'app.tasks.flush_alert_digest',
+            'schedule': settings.ALERT_DIGEST_WINDOW_MINUTES * 60,
+        },
+        'flush-sms': {
+            'task': 'app.tasks.flush_sms',
+            'schedule': max(settings.SMS_COALESCE_WINDOW_SECONDS // 4, 5),
+        },
         'send-daily-report': {
             'task': 'app.tasks.send_daily_report',
             'schedule': crontab(hour=8, minute=0),  # Every day at 8 AM
@@ -72,4 +129,10 @@ celery_app.conf.update(
             'schedule': crontab(hour=2, minute=0),  # Every day at 2 AM
         },
     }
-)
\ No newline at end of file
+)
+
+@worker_process_init.connect
+def compile_notification_templates(**kwargs):
+    """Compile the notification templates once per worker process."""
+    from app.services.notification_templates import compile_templates
+    compile_templates()
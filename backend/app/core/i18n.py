@@ -1,8 +1,11 @@
 # ============================
 # backend/app/core/i18n.py
 # ============================
+from io import BytesIO
 from pathlib import Path
 from babel import Locale
+from babel.messages.mofile import write_mo
+from babel.messages.pofile import read_po
 from babel.support import Translations
 from fastapi import Request
 from app.config import settings
@@ -13,22 +16,44 @@ logger = logging.getLogger(__name__)
 # Store translations
 translations = {}
 
+LOCALES_DIR = Path(__file__).parent.parent / "locales"
+
+def load_translations(lang: str) -> Translations:
+    """
+    Load the catalog of a language
+    The .po file is compiled in memory when no .mo file has been generated
+    """
+    po_path = LOCALES_DIR / lang / "LC_MESSAGES" / "messages.po"
+    if po_path.exists() and not po_path.with_suffix(".mo").exists():
+        with open(po_path, "rb") as f:
+            catalog = read_po(f, locale=lang)
+        buffer = BytesIO()
+        write_mo(buffer, catalog)
+        buffer.seek(0)
+        return Translations(buffer)
+    return Translations.load(LOCALES_DIR, [lang])
+
 def setup_i18n():
     """
     Configure internationalization
     """
-    locales_dir = Path(__file__).parent.parent / "locales"
-    
     for lang in settings.SUPPORTED_LANGUAGES:
         try:
-            trans = Translations.load(locales_dir, [lang])
-            translations[lang] = trans
+            translations[lang] = load_translations(lang)
             logger.info(f"Loaded translations for {lang}")
         except Exception as e:
             logger.error(f"Failed to load translations for {lang}: {e}")
             # Use empty translations as fallback
             translations[lang] = Translations()
 
+def get_translations(lang: str) -> Translations:
+    """
+    Translations of a language, loaded on first use (Celery workers do not run setup_i18n)
+    """
+    if not translations:
+        setup_i18n()
+    return translations.get(lang) or translations[settings.DEFAULT_LANGUAGE]
+
 def get_locale(request: Request) -> str:
     """
     Get locale from request headers or user preference
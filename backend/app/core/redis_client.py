@@ -0,0 +1,17 @@
+# ============================
+# backend/app/core/redis_client.py
+# ============================
+import redis
+from app.config import settings
+
+_client = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Client Redis synchrone partagé (un pool de connexions par processus)
+    """
+    global _client
+    if _client is None:
+        _client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
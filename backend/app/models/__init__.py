@@ -2,19 +2,22 @@
 # backend/app/models/__init__.py
 # ============================
 from app.models.client import Client
-from app.models.loan import Loan, LoanType, LoanStatus
+from app.models.loan import Loan, LoanNumberCounter, LoanType, LoanStatus, RepaymentSchedule
 from app.models.disbursement import Disbursement, DisbursementStatus
 from app.models.document import Document, DocumentType
 from app.models.alert import Alert, AlertType, AlertStatus
 from app.models.user import User, UserRole
+from app.models.notification import NotificationOutbox, NotificationPreference, OutboxEvent
 from app.database import Base
 
 __all__ = [
     "Base",
     "Client",
     "Loan",
+    "LoanNumberCounter",
     "LoanType",
     "LoanStatus",
+    "RepaymentSchedule",
     "Disbursement",
     "DisbursementStatus",
     "Document",
@@ -24,4 +27,7 @@ __all__ = [
     "AlertStatus",
     "User",
     "UserRole",
+    "NotificationOutbox",
+    "NotificationPreference",
+    "OutboxEvent",
 ]
\ No newline at end of file
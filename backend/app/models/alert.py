@@ -1,9 +1,9 @@
 # ============================
 # backend/app/models/alert.py
 # ============================
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.database import Base
 import enum
 
@@ -48,7 +48,7 @@ class Alert(Base):
     # Dates
     triggered_at = Column(DateTime(timezone=True), server_default=func.now())
     acknowledged_at = Column(DateTime(timezone=True))
-    resolved_at = Column(DateTime(timezone=True))
+    resolved_at = Column(DateTime(timezone=True), index=True)
     
     # Notification status
     email_sent = Column(Boolean, default=False)
@@ -56,4 +56,22 @@ class Alert(Base):
     
     # Relationships
     loan = relationship("Loan", back_populates="alerts")
-    acknowledged_by = Column(Integer, ForeignKey("users.id"))
\ No newline at end of file
+    acknowledged_by = Column(Integer, ForeignKey("users.id"))
+    
+    __table_args__ = (
+        # At most one open (non resolved) alert per loan and type
+        Index(
+            "uq_alerts_open_loan_type",
+            "loan_id",
+            "alert_type",
+            unique=True,
+            postgresql_where=(status != AlertStatus.RESOLVED),
+        ),
+    )
+
+
+# ON CONFLICT target matching uq_alerts_open_loan_type (literal predicate for index inference)
+OPEN_ALERT_CONFLICT = {
+    "index_elements": [Alert.loan_id, Alert.alert_type],
+    "index_where": text("status <> 'RESOLVED'"),
+}
\ No newline at end of file
@@ -21,7 +21,7 @@ class Disbursement(Base):
     __tablename__ = "disbursements"
 
     id = Column(Integer, primary_key=True, index=True)
-    loan_id = Column(Integer, ForeignKey("loans.id"), nullable=False)
+    loan_id = Column(Integer, ForeignKey("loans.id"), nullable=False, index=True)
     disbursement_number = Column(Integer, nullable=False)  # 1st, 2nd, etc.
     
     # Disbursement details
@@ -45,9 +45,9 @@ class Disbursement(Base):
     bet_name = Column(String(200))
     bet_report_received = Column(Boolean, default=False)
     
-    # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Timestamps (indexed: change markers of the incremental alert scan)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)
     
     # Relationships
     loan = relationship("Loan", back_populates="disbursements")
@@ -1,7 +1,7 @@
 # ============================
 # backend/app/models/loan.py
 # ============================
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum, ForeignKey, Numeric, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Boolean, Enum, ForeignKey, Numeric, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -47,6 +47,9 @@ class Loan(Base):
     first_payment_date = Column(DateTime(timezone=True))
     validity_end_date = Column(DateTime(timezone=True))
     
+    # Next date at which an alert threshold is crossed (incremental alert scan)
+    next_alert_at = Column(DateTime(timezone=True), index=True)
+    
     # Mortgage details
     mortgage_amount = Column(Numeric(15, 2))
     property_title_number = Column(String(100))
@@ -56,12 +59,47 @@ class Loan(Base):
     life_insurance_company = Column(String(100))
     fire_insurance_company = Column(String(100))
     
-    # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Timestamps (indexed: change markers of the incremental alert scan)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)
     
     # Relationships
     client = relationship("Client", back_populates="loans")
     disbursements = relationship("Disbursement", back_populates="loan")
     documents = relationship("Document", back_populates="loan")
-    alerts = relationship("Alert", back_populates="loan")
\ No newline at end of file
+    alerts = relationship("Alert", back_populates="loan")
+
+
+class LoanNumberCounter(Base):
+    """
+    Dernier numéro de séquence attribué par (année, agence), incrémenté par
+    UPDATE ... RETURNING (voir app.services.loan_numbers)
+    """
+    __tablename__ = "loan_number_counters"
+
+    year = Column(Integer, primary_key=True)
+    agency_code = Column(String(10), primary_key=True)
+    last_value = Column(BigInteger, nullable=False, default=0)
+
+
+class RepaymentSchedule(Base):
+    """
+    Échéances d'un prêt signé (app.services.repayment_schedule), différé compris
+    """
+    __tablename__ = "repayment_schedule"
+
+    id = Column(BigInteger, primary_key=True)
+    loan_id = Column(Integer, ForeignKey("loans.id", ondelete="CASCADE"), nullable=False)
+    period = Column(Integer, nullable=False)
+    due_date = Column(Date, nullable=False)
+    
+    payment = Column(Numeric(15, 2), nullable=False)
+    interest = Column(Numeric(15, 2), nullable=False)
+    principal = Column(Numeric(15, 2), nullable=False)
+    balance = Column(Numeric(15, 2), nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("loan_id", "period", name="uq_repayment_schedule_loan_period"),
+        # Upcoming payments: range scan on the due date
+        Index("ix_repayment_schedule_due_date", "due_date"),
+    )
@@ -0,0 +1,56 @@
+# ============================
+# backend/app/models/notification.py
+# ============================
+from sqlalchemy import Column, Integer, BigInteger, Boolean, DateTime, Enum, ForeignKey, Text, Index
+from sqlalchemy.sql import func
+from app.database import Base
+import enum
+
+
+class OutboxEvent(str, enum.Enum):
+    ALERT_CREATED = "ALERT_CREATED"
+    ALERT_ESCALATED = "ALERT_ESCALATED"
+
+
+class NotificationOutbox(Base):
+    """
+    Notifications à envoyer, écrites dans la même transaction que l'alerte
+    et consommées par le dispatcher (FOR UPDATE SKIP LOCKED)
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    alert_id = Column(Integer, ForeignKey("alerts.id", ondelete="CASCADE"), nullable=False)
+    event = Column(Enum(OutboxEvent), nullable=False, default=OutboxEvent.ALERT_CREATED)
+    
+    # Delivery
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    dispatched_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Only undelivered rows are scanned by the dispatcher
+        Index(
+            "ix_notification_outbox_pending",
+            "available_at",
+            "id",
+            postgresql_where=(dispatched_at.is_(None)),
+        ),
+    )
+
+
+class NotificationPreference(Base):
+    """
+    Canaux de notification choisis par un client (pas de ligne: préférences par défaut)
+    """
+    __tablename__ = "notification_preferences"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    email = Column(Boolean, nullable=False, default=True)
+    sms = Column(Boolean, nullable=False, default=True)
+    push = Column(Boolean, nullable=False, default=True)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -30,6 +30,8 @@ class User(Base):
     # User details
     role = Column(Enum(UserRole), nullable=False)
     agency = Column(String(100))
+    # Agency code of the loan numbers (YYYY/AGENCY/SEQ/TYPE); NULL: settings.LOAN_AGENCY_CODE
+    agency_code = Column(String(10), index=True)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
     
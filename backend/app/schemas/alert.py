@@ -3,8 +3,8 @@
 # ============================
 from __future__ import annotations
 
-from typing import Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import date, datetime
 from pydantic import Field
 from app.schemas.base import BaseSchema, TimestampedSchema
 
@@ -39,4 +39,23 @@ class AlertSummary(BaseSchema):
     severity: str
     message: str
     status: str
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+class AlertSimulationRequest(BaseSchema):
+    horizon_days: int = Field(30, ge=1, le=365)
+    # {"RENTAL_ORDINARY": {"validity_orange_days": 45}}, "*" for every loan type
+    overrides: Dict[str, Dict[str, int]] = Field(default_factory=dict)
+    include_open: bool = False
+
+class AlertSimulationDay(BaseSchema):
+    date: date
+    new: Dict[str, int]
+    active: Dict[str, int]
+
+class AlertSimulationResponse(BaseSchema):
+    horizon_days: int
+    loans: int
+    days: List[AlertSimulationDay]
+    totals: Dict[str, int]
+    by_severity: Dict[str, int]
+    elapsed_ms: float
@@ -27,6 +27,8 @@ class UserCreate(BaseModel):
     password: str = Field(..., min_length=8)
     role: UserRole
     agency: Optional[str] = None
+    # Agency code of the loan numbers, e.g. "102" (default: LOAN_AGENCY_CODE)
+    agency_code: Optional[str] = Field(None, max_length=10)
     preferred_language: str = Field("fr", pattern="^(fr|en)$")
 
 
@@ -37,6 +39,7 @@ class UserResponse(BaseModel):
     full_name: str
     role: UserRole
     agency: Optional[str] = None
+    agency_code: Optional[str] = None
     is_active: bool
     preferred_language: str
     
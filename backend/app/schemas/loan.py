@@ -4,7 +4,7 @@
 from __future__ import annotations
 
 from typing import Optional, List, Any, Dict
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from pydantic import BaseModel, Field, validator
 from app.schemas.base import BaseSchema, TimestampedSchema
@@ -26,6 +26,12 @@ class LoanCreate(LoanBase):
 
 class LoanUpdate(BaseSchema):
     status: Optional[LoanStatus] = None
+    # Changing these recomputes the monthly payment and the repayment schedule
+    # (no decimal_places: pydantic 2.5 rejects it on an Optional[Decimal])
+    amount: Optional[Decimal] = Field(None, gt=0)
+    interest_rate: Optional[Decimal] = Field(None, gt=0)
+    duration_months: Optional[int] = Field(None, gt=0)
+    grace_period_months: Optional[int] = Field(None, ge=0)
     approval_date: Optional[datetime] = None
     signature_date: Optional[datetime] = None
     first_payment_date: Optional[datetime] = None
@@ -60,4 +66,55 @@ class LoanWithDetails(LoanResponse):
     # Use Dict instead of specific schemas to avoid circular imports
     client: Dict[str, Any]
     disbursements: List[Dict[str, Any]] = []
-    alerts: List[Dict[str, Any]] = []
\ No newline at end of file
+    alerts: List[Dict[str, Any]] = []
+
+class RepaymentScheduleLine(BaseSchema):
+    period: int
+    due_date: Optional[date] = None
+    payment: Decimal
+    interest: Decimal
+    principal: Decimal
+    balance: Decimal
+
+class RepaymentScheduleResponse(BaseSchema):
+    loan_id: int
+    loan_number: str
+    monthly_payment: Decimal
+    # False: NumPy preview rounded to the cent, True: exact Decimal schedule
+    exact: bool
+    total_paid: Decimal
+    total_interest: Decimal
+    lines: List[RepaymentScheduleLine]
+
+class LoanSimulationScenario(BaseSchema):
+    loan_type: LoanType
+    amount: Decimal = Field(..., gt=0)
+    # 0 allowed: interest-free loans are repaid in equal parts of the principal
+    interest_rate: Decimal = Field(..., ge=0)
+    duration_months: int = Field(..., gt=0)
+    grace_period_months: int = Field(0, ge=0)
+
+class LoanSimulationRequest(BaseSchema):
+    scenarios: List[LoanSimulationScenario] = Field(..., min_length=1, max_length=10000)
+
+class LoanSimulationResult(BaseSchema):
+    monthly_payment: float
+    total_paid: float
+    # Total cost of the credit (interest, grace period included)
+    total_interest: float
+    validity_end_date: datetime
+
+class LoanSimulationResponse(BaseSchema):
+    # In the order of the requested scenarios
+    results: List[LoanSimulationResult]
+    elapsed_ms: float
+
+class LoanImportJob(BaseSchema):
+    job_id: str
+    # Celery state: PENDING, PROGRESS, SUCCESS or FAILURE
+    status: str
+    # {"processed", "imported", "failed"} while the import runs
+    progress: Optional[Dict[str, int]] = None
+    # Final report: counters, first per-row errors and duration
+    report: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
@@ -0,0 +1,216 @@
+# ============================
+# backend/app/services/alert_digest.py
+# ============================
+"""
+Récapitulatif des alertes destiné aux administrateurs.
+
+Les notifications administrateur sont mises en tampon dans Redis (une liste par
+agence) puis envoyées en un seul email par agence, à chaque fenêtre
+(ALERT_DIGEST_WINDOW_MINUTES) ou dès que ALERT_DIGEST_MAX_ITEMS éléments sont en attente.
+
+La remise est suivie par destinataire (clés de déduplication): si l'envoi échoue
+pour un destinataire, les éléments sont remis en tampon mais ne seront renvoyés
+qu'aux destinataires qui ne les ont pas reçus.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.redis_client import get_redis
+from app.models import Alert, Loan, Client, User, UserRole
+from app.services.notification_dedup import NotificationDeduplicator
+from app.services.notification_templates import SEVERITY_ICONS, get_templates
+
+logger = logging.getLogger(__name__)
+
+DIGEST_KEY_PREFIX = "alerts:digest:"
+DIGEST_AGENCIES_KEY = "alerts:digest:agencies"
+# Agency of loans whose number does not follow YYYY/AGENCY/SEQ/TYPE
+UNKNOWN_AGENCY = "000"
+DIGEST_RECIPIENT_ROLES = [UserRole.ADMIN, UserRole.DIRECTEUR_AGENCE]
+
+
+def loan_agency_code(loan_number: Optional[str]) -> str:
+    """
+    Code agence contenu dans le numéro de dossier (YYYY/AGENCE/SEQ/TYPE)
+    """
+    parts = (loan_number or "").split("/")
+    return parts[1] if len(parts) == 4 and parts[1] else UNKNOWN_AGENCY
+
+
+def digest_item_key(item: Dict) -> str:
+    """
+    Clé de remise d'un élément: une escalade de la même alerte est un nouvel élément
+    """
+    return f"{item['alert_id']}:{item['status']}"
+
+
+def digest_item(alert: Alert, loan: Loan, client: Client) -> Dict:
+    """
+    Élément du récapitulatif: uniquement des valeurs sérialisables en JSON
+    """
+    return {
+        "alert_id": alert.id,
+        "alert_type": alert.alert_type.value,
+        "severity": alert.severity,
+        "status": alert.status.value if alert.status else None,
+        "message": alert.message,
+        "loan_id": loan.id,
+        "loan_number": loan.loan_number,
+        "client_name": client.name,
+        "client_phone": client.phone,
+    }
+
+
+class AlertDigest:
+    def __init__(self, db: Session, redis_client=None):
+        self.db = db
+        self.redis = redis_client or get_redis()
+
+    def add(self, items: Iterable[Dict]) -> List[str]:
+        """
+        Mettre des éléments en tampon (un seul aller-retour Redis) et renvoyer les
+        agences dont le tampon vient d'atteindre ALERT_DIGEST_MAX_ITEMS
+        """
+        by_agency: Dict[str, List[str]] = {}
+        for item in items:
+            by_agency.setdefault(loan_agency_code(item["loan_number"]), []).append(json.dumps(item))
+        if not by_agency:
+            return []
+
+        pipe = self.redis.pipeline()
+        for agency, payloads in by_agency.items():
+            pipe.rpush(DIGEST_KEY_PREFIX + agency, *payloads)
+            pipe.sadd(DIGEST_AGENCIES_KEY, agency)
+        lengths = pipe.execute()[::2]
+
+        full = []
+        for (agency, payloads), length in zip(by_agency.items(), lengths):
+            # Only the push that crosses the threshold requests an early flush
+            if length >= settings.ALERT_DIGEST_MAX_ITEMS > length - len(payloads):
+                full.append(agency)
+        return full
+
+    def _take(self, agency: str) -> List[Dict]:
+        """
+        Retirer atomiquement le tampon d'une agence (MULTI/EXEC)
+        """
+        pipe = self.redis.pipeline()
+        pipe.lrange(DIGEST_KEY_PREFIX + agency, 0, -1)
+        pipe.delete(DIGEST_KEY_PREFIX + agency)
+        pipe.srem(DIGEST_AGENCIES_KEY, agency)
+        payloads = pipe.execute()[0]
+        return [json.loads(payload) for payload in payloads]
+
+    def _requeue(self, agency: str, items: List[Dict]):
+        pipe = self.redis.pipeline()
+        pipe.lpush(DIGEST_KEY_PREFIX + agency, *(json.dumps(item) for item in reversed(items)))
+        pipe.sadd(DIGEST_AGENCIES_KEY, agency)
+        pipe.execute()
+
+    def flush(self, agencies: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Envoyer un récapitulatif par agence et renvoyer le nombre d'alertes envoyées par agence
+        """
+        # Import here to avoid circular imports
+        from app.services.notification_service import NotificationService
+
+        if agencies is None:
+            agencies = sorted(self.redis.smembers(DIGEST_AGENCIES_KEY))
+        buffered = {agency: self._take(agency) for agency in agencies}
+        buffered = {agency: items for agency, items in buffered.items() if items}
+        if not buffered:
+            return {}
+
+        recipients = self._recipients(list(buffered))
+        deduplicator = NotificationDeduplicator(self.redis)
+        # (agency, locale, item keys) -> addresses: one rendering per distinct digest
+        digests: Dict[Tuple[str, str, Tuple[str, ...]], List[str]] = {}
+        for agency, items in buffered.items():
+            by_locale = recipients.get(agency) or {settings.DEFAULT_LANGUAGE: [settings.ALERT_DIGEST_FALLBACK_EMAIL]}
+            keys = [digest_item_key(item) for item in items]
+            for locale, addresses in by_locale.items():
+                for email in addresses:
+                    # Items already delivered to this recipient (requeued for another one) are skipped
+                    claimed = deduplicator.claim(f"digest:{email}", keys)
+                    email_keys = tuple(key for key in keys if key in claimed)
+                    if email_keys:
+                        digests.setdefault((agency, locale, email_keys), []).append(email)
+
+        emails = []
+        for (agency, locale, keys), addresses in digests.items():
+            items = [item for item in buffered[agency] if digest_item_key(item) in keys]
+            subject, message = self._format_digest(agency, items, locale)
+            emails += [(agency, keys, (email, subject, message)) for email in addresses]
+        results = NotificationService(self.db).send_email_notifications([email for _, _, email in emails])
+
+        undelivered: Dict[str, set] = {agency: set() for agency in buffered}
+        for (agency, keys, (email, _, _)), ok in zip(emails, results):
+            if not ok:
+                deduplicator.release(f"digest:{email}", keys)
+                undelivered[agency].update(keys)
+
+        sent = {}
+        for agency, items in buffered.items():
+            # Keep the items some recipient did not get for the next window
+            failed = [item for item in items if digest_item_key(item) in undelivered[agency]]
+            sent[agency] = len(items) - len(failed)
+            if failed:
+                self._requeue(agency, failed)
+                logger.warning(f"Alert digest for agency {agency} not fully delivered, {len(failed)} items requeued")
+
+        logger.info(f"📨 Alert digests sent: {sent}")
+        return sent
+
+    def _recipients(self, agencies: List[str]) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Administrateurs et directeurs actifs de chaque agence, par langue (une seule requête)
+        
+        L'agence d'un utilisateur est son code agence des numéros de prêt, celui
+        de LoanNumberAllocator par défaut (settings.LOAN_AGENCY_CODE)
+        """
+        agency_code = func.coalesce(User.agency_code, settings.LOAN_AGENCY_CODE)
+        rows = self.db.execute(
+            select(agency_code.label("agency_code"), User.email, User.preferred_language).where(
+                agency_code.in_(agencies),
+                User.role.in_(DIGEST_RECIPIENT_ROLES),
+                User.is_active.is_(True)
+            )
+        )
+        recipients: Dict[str, Dict[str, List[str]]] = {}
+        for row in rows:
+            locale = row.preferred_language or settings.DEFAULT_LANGUAGE
+            recipients.setdefault(row.agency_code, {}).setdefault(locale, []).append(row.email)
+        return recipients
+
+    @staticmethod
+    def _format_digest(agency: str, items: List[Dict], locale: str) -> Tuple[str, str]:
+        """
+        Objet et corps du récapitulatif d'une agence dans la langue donnée
+        """
+        templates = get_templates(locale)
+        by_severity = Counter(item["severity"] for item in items)
+        by_type = Counter(item["alert_type"] for item in items)
+        # Most urgent first
+        items = sorted(items, key=lambda item: (item["severity"] != "RED", item["alert_type"], item["loan_id"]))
+
+        lines = "\n".join(
+            templates.render("digest_line", severity_icon=SEVERITY_ICONS.get(item["severity"], "🟠"), **item)
+            for item in items
+        )
+        types = "\n".join(f"- {alert_type} : {count}" for alert_type, count in sorted(by_type.items()))
+
+        subject = templates.render("digest_subject", agency=agency, count=len(items))
+        message = templates.render(
+            "digest",
+            agency=agency,
+            count=len(items),
+            red=by_severity.get("RED", 0),
+            orange=by_severity.get("ORANGE", 0),
+            by_type=types,
+            lines=lines,
+        )
+        return subject, message
@@ -0,0 +1,88 @@
+# ============================
+# backend/app/services/alert_escalation.py
+# ============================
+"""
+Échéancier d'escalade des alertes.
+
+Chaque alerte ouverte a une échéance d'escalade stockée dans un ZSET Redis
+(membre: id de l'alerte, score: timestamp Unix). La tâche périodique ne lit que
+les entrées échues (ZRANGEBYSCORE), sans parcourir la table alerts.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import time
+from app.config import settings
+from app.core.redis_client import get_redis
+
+ESCALATION_QUEUE_KEY = "alerts:escalation:due"
+
+# Pop the due entries atomically so that overlapping beat ticks never escalate twice
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+_pop_due = None
+
+
+def escalation_deadline(severity: Optional[str], acknowledged: bool = False, now: Optional[float] = None) -> float:
+    """
+    Échéance d'escalade (timestamp Unix) d'une alerte selon sa sévérité et son état
+    """
+    if acknowledged:
+        hours = settings.ALERT_ESCALATION_ACKNOWLEDGED_HOURS
+    else:
+        hours = settings.ALERT_ESCALATION_HOURS.get(severity, max(settings.ALERT_ESCALATION_HOURS.values()))
+    return (now if now is not None else time.time()) + hours * 3600
+
+
+class AlertEscalationScheduler:
+    """
+    File des échéances d'escalade (ZSET Redis)
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client or get_redis()
+
+    def schedule(self, alerts: Iterable[Tuple[int, Optional[str]]], acknowledged: bool = False,
+                 keep_earliest: bool = False):
+        """
+        Planifier l'escalade des alertes (id, sévérité) en un seul ZADD
+
+        keep_earliest: ne jamais repousser une échéance déjà planifiée (ZADD LT)
+        """
+        now = time.time()
+        deadlines: Dict[str, float] = {
+            str(alert_id): escalation_deadline(severity, acknowledged, now) for alert_id, severity in alerts
+        }
+        if deadlines:
+            self.redis.zadd(ESCALATION_QUEUE_KEY, deadlines, lt=keep_earliest)
+
+    def cancel(self, alert_id: int):
+        self.redis.zrem(ESCALATION_QUEUE_KEY, str(alert_id))
+
+    def pop_due(self, limit: Optional[int] = None, now: Optional[float] = None) -> List[int]:
+        """
+        Retirer et renvoyer les alertes dont l'échéance est passée
+        """
+        global _pop_due
+        if _pop_due is None:
+            _pop_due = self.redis.register_script(POP_DUE_SCRIPT)
+
+        due = _pop_due(
+            keys=[ESCALATION_QUEUE_KEY],
+            args=[now if now is not None else time.time(), limit or settings.ALERT_ESCALATION_BATCH_SIZE],
+            client=self.redis
+        )
+        return [int(alert_id) for alert_id in due]
+
+    def requeue(self, alert_ids: Iterable[int]):
+        """
+        Remettre des alertes dans la file, échues immédiatement (nouvelle tentative)
+        """
+        now = time.time()
+        mapping = {str(alert_id): now for alert_id in alert_ids}
+        if mapping:
+            self.redis.zadd(ESCALATION_QUEUE_KEY, mapping)
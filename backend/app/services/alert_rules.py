@@ -0,0 +1,507 @@
+# ============================
+# backend/app/services/alert_rules.py
+# ============================
+"""
+Registre déclaratif des règles d'alerte.
+
+Les seuils sont définis une seule fois par type de prêt (LOAN_TYPE_POLICIES) et
+chaque règle est compilée une seule fois, à l'import du module (donc au démarrage
+du worker), en :
+- une requête SQL (loan_id, message) utilisée par le scan ensembliste,
+- une date de prochain franchissement de seuil (Loan.next_alert_at),
+- un évaluateur NumPy vectorisé utilisé par le scan en mémoire et les simulations.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from sqlalchemy import DateTime, Integer, and_, case, cast, exists, func, select, true
+from app.models import Alert, AlertType, AlertStatus, Loan, LoanType, LoanStatus, Disbursement
+from app.models.disbursement import DisbursementStatus
+from app.services.repayment_schedule import repayment_start_date
+
+
+@dataclass(frozen=True)
+class LoanTypePolicy:
+    """
+    Seuils d'alerte propres à un type de prêt
+    """
+    validity_days: int  # Durée de validité de l'offre
+    validity_orange_days: int  # Jours restants déclenchant l'alerte orange
+    validity_red_days: int = 5  # Jours restants déclenchant l'alerte rouge
+    repayment_notice_days: int = 30  # Préavis avant la fin du différé
+    work_progress_per_day: int = 3  # Avancement attendu des travaux (% par jour)
+    work_delay_tolerance: int = 20  # Retard toléré (points de %)
+
+
+LOAN_TYPE_POLICIES: Dict[LoanType, LoanTypePolicy] = {
+    LoanType.CLASSIC_ACQUIRER: LoanTypePolicy(validity_days=60, validity_orange_days=40),
+    LoanType.CLASSIC_BUILDER: LoanTypePolicy(validity_days=60, validity_orange_days=40),
+    LoanType.YOUNG_LAND: LoanTypePolicy(validity_days=60, validity_orange_days=40),
+    LoanType.RENTAL_ORDINARY: LoanTypePolicy(validity_days=90, validity_orange_days=60),
+}
+
+# Integer codes used by the vectorised evaluators
+LOAN_TYPE_CODES = {loan_type: code for code, loan_type in enumerate(LoanType)}
+LOAN_STATUS_CODES = {status: code for code, status in enumerate(LoanStatus)}
+DISBURSEMENT_STATUS_CODES = {status: code for code, status in enumerate(DisbursementStatus)}
+
+# A bound is either a constant or the name of a LoanTypePolicy field
+Bound = Union[int, str, None]
+ScanScope = Optional[Callable]
+
+DAY = np.timedelta64(1, "D")
+
+
+# ----------------------------
+# SQL helpers
+# ----------------------------
+
+def in_scope(column, scope: ScanScope):
+    """
+    Restreindre une requête au périmètre du scan (tous les prêts si scope est None)
+    """
+    return scope(column) if scope is not None else true()
+
+
+def sql_days(count):
+    return func.make_interval(0, 0, 0, count)
+
+
+def sql_days_until(column):
+    """
+    Nombre de jours entiers entre maintenant et la date donnée (équivalent SQL de timedelta.days)
+    """
+    return cast(func.floor(func.extract("epoch", column - func.now()) / 86400), Integer)
+
+
+def sql_if_future(moment):
+    """
+    La date si elle est dans le futur, NULL sinon (ignorée par LEAST)
+    """
+    return case((moment > func.now(), moment))
+
+
+def no_open_alert(loan_id, alert_type: AlertType):
+    """
+    Prédicat NOT EXISTS: aucune alerte non résolue du même type pour le prêt
+    """
+    return ~exists().where(
+        Alert.loan_id == loan_id,
+        Alert.alert_type == alert_type,
+        Alert.status != AlertStatus.RESOLVED
+    )
+
+
+@lru_cache(maxsize=None)
+def sql_policy(value: Bound):
+    """
+    Valeur d'un seuil en SQL: constante, ou CASE sur Loan.loan_type si elle dépend du type
+    """
+    if value is None or isinstance(value, int):
+        return value
+
+    by_value: Dict[int, List[LoanType]] = {}
+    for loan_type, policy in LOAN_TYPE_POLICIES.items():
+        by_value.setdefault(getattr(policy, value), []).append(loan_type)
+    if len(by_value) == 1:
+        return next(iter(by_value))
+
+    *branches, (default, _) = by_value.items()
+    return case(
+        *((Loan.loan_type.in_(loan_types), threshold) for threshold, loan_types in branches),
+        else_=default
+    )
+
+
+# ----------------------------
+# NumPy helpers
+# ----------------------------
+
+@lru_cache(maxsize=None)
+def np_policy_table(name: str) -> np.ndarray:
+    """
+    Table des valeurs d'un seuil indexée par le code du type de prêt
+    """
+    return np.array([getattr(LOAN_TYPE_POLICIES[loan_type], name) for loan_type in LoanType])
+
+
+def np_policy(value: Bound, loan_type_codes: np.ndarray,
+              policies: Optional[Dict[LoanType, LoanTypePolicy]] = None):
+    """
+    Valeur d'un seuil pour chaque ligne (policies: jeu de seuils alternatif, ex. simulation)
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if policies is None:
+        return np_policy_table(value)[loan_type_codes]
+    return np.array([getattr(policies[loan_type], value) for loan_type in LoanType])[loan_type_codes]
+
+
+def np_days_until(dates: np.ndarray, now: np.datetime64) -> np.ndarray:
+    """
+    Jours entiers entre now et chaque date (NaN pour les dates absentes)
+    """
+    return np.floor((dates - now) / DAY)
+
+
+def to_datetime64(value: Optional[datetime]):
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def np_now(now: Optional[datetime] = None) -> np.datetime64:
+    return np.datetime64(to_datetime64(now or datetime.now(timezone.utc)), "s")
+
+
+# ----------------------------
+# Metrics
+# ----------------------------
+
+class Metric:
+    """
+    Grandeur surveillée par une règle, avec ses filtres d'éligibilité
+    """
+    source = "loan"  # "loan" or "disbursement"
+
+    def sql_loan_id(self):
+        return Loan.id
+
+    def sql_filters(self) -> list:
+        raise NotImplementedError
+
+    def sql_value(self):
+        raise NotImplementedError
+
+    def sql_message_value(self):
+        return self.sql_value()
+
+    def sql_select(self, *columns):
+        return select(*columns)
+
+    def sql_checkpoint(self, lower: Bound, upper: Bound):
+        """
+        Date à laquelle la grandeur entre dans la fenêtre ]lower, upper]
+        """
+        raise NotImplementedError
+
+    def np_filters(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        raise NotImplementedError
+
+    def np_value(self, columns: Dict[str, np.ndarray], now: np.datetime64, policies=None) -> np.ndarray:
+        raise NotImplementedError
+
+    def np_message_value(self, columns: Dict[str, np.ndarray], value: np.ndarray) -> np.ndarray:
+        return value
+
+
+class DaysUntilMetric(Metric):
+    """
+    Jours restants avant une date du prêt (décroît avec le temps)
+    """
+
+    def __init__(self, statuses: Iterable[LoanStatus]):
+        self.statuses = list(statuses)
+        # Lookup table indexed by status code: cheaper than np.isin on every evaluation
+        self.status_mask = np.zeros(len(LOAN_STATUS_CODES), dtype=bool)
+        self.status_mask[[LOAN_STATUS_CODES[status] for status in self.statuses]] = True
+
+    def sql_date(self):
+        raise NotImplementedError
+
+    def np_date(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        raise NotImplementedError
+
+    def sql_filters(self) -> list:
+        return [Loan.status.in_(self.statuses)]
+
+    def sql_value(self):
+        return sql_days_until(self.sql_date())
+
+    def sql_checkpoint(self, lower: Bound, upper: Bound):
+        # days_until <= N as soon as less than N + 1 days remain
+        return self.sql_date() - sql_days(sql_policy(upper) + 1)
+
+    def np_filters(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        return self.status_mask[columns["status"]]
+
+    def np_value(self, columns: Dict[str, np.ndarray], now: np.datetime64, policies=None) -> np.ndarray:
+        return np_days_until(self.np_date(columns), now)
+
+
+class ValidityMetric(DaysUntilMetric):
+    """
+    Jours restants avant l'expiration de l'offre
+    """
+
+    def sql_date(self):
+        return Loan.validity_end_date
+
+    def np_date(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        return columns["validity_end_date"]
+
+
+class GraceEndMetric(DaysUntilMetric):
+    """
+    Jours restants avant la fin du différé (premier remboursement), lue dans
+    l'échéancier des prêts signés et estimée pour les autres
+    """
+
+    def sql_date(self):
+        return func.coalesce(
+            cast(repayment_start_date(), DateTime(timezone=True)),
+            Loan.first_payment_date + sql_days(Loan.grace_period_months * 30)
+        )
+
+    def np_date(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        estimated = columns["first_payment_date"] + (columns["grace_period_months"] * 30).astype("timedelta64[D]")
+        scheduled = columns["repayment_start_date"]
+        return np.where(np.isnat(scheduled), estimated, scheduled)
+
+    def sql_filters(self) -> list:
+        return super().sql_filters() + [Loan.grace_period_months > 0, Loan.first_payment_date.isnot(None)]
+
+    def np_filters(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        return super().np_filters(columns) & (columns["grace_period_months"] > 0)
+
+
+class WorkDelayMetric(Metric):
+    """
+    Retard des travaux: avancement attendu (plafonné à 100%) moins avancement constaté
+    """
+    source = "disbursement"
+
+    def sql_loan_id(self):
+        return Disbursement.loan_id
+
+    def sql_filters(self) -> list:
+        return [
+            Disbursement.status == DisbursementStatus.IN_PROGRESS,
+            Loan.status == LoanStatus.DISBURSING,
+            Disbursement.request_date.isnot(None),
+        ]
+
+    def sql_value(self):
+        days_elapsed = -sql_days_until(Disbursement.request_date)
+        expected = func.least(days_elapsed * sql_policy("work_progress_per_day"), 100)
+        return expected - Disbursement.work_completion_percentage
+
+    def sql_message_value(self):
+        return Disbursement.work_completion_percentage
+
+    def sql_select(self, *columns):
+        # DISTINCT ON: a single alert per loan even with several disbursements in progress
+        return select(*columns).select_from(Disbursement).join(
+            Loan, Loan.id == Disbursement.loan_id
+        ).distinct(Disbursement.loan_id).order_by(
+            Disbursement.loan_id, Disbursement.work_completion_percentage
+        )
+
+    def sql_checkpoint(self, lower: Bound, upper: Bound):
+        # expected - work > lower from day (work + lower) // rate + 1, unreachable once work + lower >= 100
+        work = func.coalesce(Disbursement.work_completion_percentage, 0)
+        checkpoint = Disbursement.request_date + sql_days(
+            (work + sql_policy(lower)) // sql_policy("work_progress_per_day") + 1
+        )
+        return case((work + sql_policy(lower) < 100, checkpoint))
+
+    def np_filters(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        return (
+            (columns["disbursement_status"] == DISBURSEMENT_STATUS_CODES[DisbursementStatus.IN_PROGRESS])
+            & (columns["status"] == LOAN_STATUS_CODES[LoanStatus.DISBURSING])
+        )
+
+    def np_value(self, columns: Dict[str, np.ndarray], now: np.datetime64, policies=None) -> np.ndarray:
+        days_elapsed = -np_days_until(columns["request_date"], now)
+        rate = np_policy("work_progress_per_day", columns["loan_type"], policies)
+        return np.minimum(days_elapsed * rate, 100) - columns["work_completion_percentage"]
+
+    def np_message_value(self, columns: Dict[str, np.ndarray], value: np.ndarray) -> np.ndarray:
+        return columns["work_completion_percentage"]
+
+
+# ----------------------------
+# Rules
+# ----------------------------
+
+@dataclass(frozen=True)
+class AlertRule:
+    """
+    Règle déclarative: une alerte est levée quand lower < métrique <= upper
+    """
+    alert_type: AlertType
+    severity: str
+    metric: Metric
+    lower: Bound
+    upper: Bound
+    message: Tuple[str, str]  # Text before and after the metric's message field
+    _candidates: object = field(init=False, repr=False, compare=False)
+    _next_check: object = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Compile the SQL side once; scans only add their scope predicate
+        value = self.metric.sql_value()
+        window = [value > sql_policy(self.lower)]
+        if self.upper is not None:
+            window.append(value <= sql_policy(self.upper))
+
+        loan_id = self.metric.sql_loan_id()
+        candidates = self.metric.sql_select(
+            loan_id.label("loan_id"),
+            func.concat(self.message[0], self.metric.sql_message_value(), self.message[1]).label("message")
+        ).where(
+            *self.metric.sql_filters(),
+            *window,
+            no_open_alert(loan_id, self.alert_type)
+        )
+
+        checkpoint = sql_if_future(self.metric.sql_checkpoint(self.lower, self.upper))
+        if self.metric.source == "disbursement":
+            next_check = select(func.min(checkpoint)).where(
+                Disbursement.loan_id == Loan.id,
+                *self.metric.sql_filters()
+            ).scalar_subquery()
+        else:
+            next_check = case((and_(*self.metric.sql_filters()), checkpoint))
+
+        object.__setattr__(self, "_candidates", candidates)
+        object.__setattr__(self, "_next_check", next_check)
+
+    def candidates(self, scope: ScanScope = None):
+        """
+        Sous-requête (loan_id, message) des prêts qui déclenchent la règle
+        et n'ont pas encore d'alerte ouverte de ce type
+        """
+        return self._candidates.where(in_scope(self.metric.sql_loan_id(), scope)).subquery()
+
+    def next_check(self):
+        """
+        Prochaine date (future) à laquelle la règle peut se déclencher pour Loan
+        """
+        return self._next_check
+
+    def evaluate(self, columns: Dict[str, np.ndarray], now: np.datetime64,
+                 policies: Optional[Dict[LoanType, LoanTypePolicy]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Évaluation vectorisée: masque des lignes qui déclenchent la règle et
+        valeur à insérer dans le message
+        """
+        loan_types = columns["loan_type"]
+        value = self.metric.np_value(columns, now, policies)
+        with np.errstate(invalid="ignore"):
+            mask = self.metric.np_filters(columns) & (value > np_policy(self.lower, loan_types, policies))
+            if self.upper is not None:
+                mask &= value <= np_policy(self.upper, loan_types, policies)
+        return mask, self.metric.np_message_value(columns, value)
+
+    def format_message(self, value) -> str:
+        return f"{self.message[0]}{int(value)}{self.message[1]}"
+
+
+VALIDITY_STATUSES = [LoanStatus.APPROVED, LoanStatus.IN_PROGRESS]
+
+ALERT_RULES: List[AlertRule] = [
+    AlertRule(
+        alert_type=AlertType.VALIDITY_CRITICAL,
+        severity="RED",
+        metric=ValidityMetric(VALIDITY_STATUSES),
+        lower=0,
+        upper="validity_red_days",
+        message=("URGENT: L'offre de prêt expire dans ", " jours!"),
+    ),
+    AlertRule(
+        alert_type=AlertType.VALIDITY_WARNING,
+        severity="ORANGE",
+        metric=ValidityMetric(VALIDITY_STATUSES),
+        lower="validity_red_days",
+        upper="validity_orange_days",
+        message=("Attention: Il reste ", " jours avant l'expiration de l'offre"),
+    ),
+    AlertRule(
+        alert_type=AlertType.WORK_DELAY_WARNING,
+        severity="ORANGE",
+        metric=WorkDelayMetric(),
+        lower="work_delay_tolerance",
+        upper=None,
+        message=("Retard constaté sur les travaux: ", "% réalisé"),
+    ),
+    AlertRule(
+        alert_type=AlertType.REPAYMENT_UPCOMING,
+        severity="ORANGE",
+        metric=GraceEndMetric([LoanStatus.DISBURSING]),
+        lower=0,
+        upper="repayment_notice_days",
+        message=("Le remboursement commence dans ", " jours"),
+    ),
+]
+
+RULES_BY_SOURCE: Dict[str, List[AlertRule]] = {
+    source: [rule for rule in ALERT_RULES if rule.metric.source == source]
+    for source in ("loan", "disbursement")
+}
+
+
+# ----------------------------
+# Columnar input of the vectorised evaluators
+# ----------------------------
+
+def loan_columns_query(scope: ScanScope = None):
+    return select(
+        Loan.id.label("loan_id"),
+        Loan.loan_type,
+        Loan.status,
+        Loan.validity_end_date,
+        Loan.first_payment_date,
+        Loan.grace_period_months,
+        repayment_start_date().label("repayment_start_date"),
+    ).where(in_scope(Loan.id, scope))
+
+
+def disbursement_columns_query(scope: ScanScope = None):
+    return select(
+        Disbursement.loan_id,
+        Loan.loan_type,
+        Loan.status,
+        Disbursement.status.label("disbursement_status"),
+        Disbursement.request_date,
+        Disbursement.work_completion_percentage,
+    ).join(Loan, Loan.id == Disbursement.loan_id).where(in_scope(Disbursement.loan_id, scope))
+
+
+def to_columns(rows: list, source: str) -> Dict[str, np.ndarray]:
+    """
+    Convertir un lot de lignes (résultat de *_columns_query) en tableaux NumPy
+    """
+    columns = {
+        "loan_id": np.array([row.loan_id for row in rows], dtype=np.int64),
+        "loan_type": np.array([LOAN_TYPE_CODES[row.loan_type] for row in rows], dtype=np.int64),
+        "status": np.array([LOAN_STATUS_CODES[row.status] for row in rows], dtype=np.int64),
+    }
+    if source == "disbursement":
+        columns["disbursement_status"] = np.array(
+            [DISBURSEMENT_STATUS_CODES.get(row.disbursement_status, -1) for row in rows], dtype=np.int64
+        )
+        columns["request_date"] = np.array(
+            [to_datetime64(row.request_date) for row in rows], dtype="datetime64[s]"
+        )
+        columns["work_completion_percentage"] = np.array(
+            [row.work_completion_percentage for row in rows], dtype=np.float64
+        )
+    else:
+        columns["validity_end_date"] = np.array(
+            [to_datetime64(row.validity_end_date) for row in rows], dtype="datetime64[s]"
+        )
+        columns["first_payment_date"] = np.array(
+            [to_datetime64(row.first_payment_date) for row in rows], dtype="datetime64[s]"
+        )
+        columns["grace_period_months"] = np.array(
+            [row.grace_period_months or 0 for row in rows], dtype=np.int64
+        )
+        columns["repayment_start_date"] = np.array(
+            [row.repayment_start_date for row in rows], dtype="datetime64[s]"
+        )
+    return columns
@@ -1,171 +1,327 @@
 # ============================
 # backend/app/services/alert_service.py
 # ============================
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+import tracemalloc
+from sqlalchemy import func, literal, select, text, tuple_, union, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from app.models import Alert, Loan, Disbursement, AlertType, AlertStatus
-from app.models.loan import LoanStatus
-from app.models.disbursement import DisbursementStatus
+from app.config import settings
+from app.models import Alert, Loan, Disbursement, AlertType, AlertStatus, OutboxEvent
+from app.models.alert import OPEN_ALERT_CONFLICT
+from app.core.redis_client import get_redis
+from app.services.alert_rules import (
+    ALERT_RULES,
+    RULES_BY_SOURCE,
+    ScanScope,
+    disbursement_columns_query,
+    in_scope,
+    loan_columns_query,
+    np_now,
+    to_columns,
+)
+from app.services.alert_escalation import AlertEscalationScheduler
+from app.services.alert_writer import AlertWriter
+from app.services.notification_outbox import with_outbox
 import logging
 
 logger = logging.getLogger(__name__)
 
+SCAN_WATERMARK_KEY = "alerts:scan:watermark"
+# Rows fetched per round trip by the streaming (server-side cursor) scans
+SCAN_BATCH_SIZE = 1000
+# GROUPING(severity, alert_type, status) values of the summary grouping sets
+GROUPED_BY_SEVERITY = 0b011
+GROUPED_BY_TYPE = 0b101
+GROUPED_BY_STATUS = 0b110
+
+
+@contextmanager
+def traced_peak_memory():
+    """
+    Pic des allocations Python (NumPy compris) pendant le bloc, en Mo: propre à
+    chaque scan, contrairement à ru_maxrss qui garde le pic de vie du processus
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    peak = {"mb": 0.0}
+    try:
+        yield peak
+    finally:
+        peak["mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        if started:
+            tracemalloc.stop()
+
 
 class AlertService:
     def __init__(self, db: Session):
         self.db = db
+        self.writer = AlertWriter(db)
+        self.escalations = AlertEscalationScheduler()
     
-    def check_all_alerts(self):
+    def check_all_alerts(self, mode: Optional[str] = None):
         """
         Vérifier tous les prêts et créer des alertes si nécessaire
         """
-        self._check_validity_alerts()
-        self._check_disbursement_alerts()
-        self._check_repayment_alerts()
+        mode = mode or settings.ALERT_EVALUATION_MODE
+        
+        with traced_peak_memory() as peak:
+            if mode == "set":
+                self._check_all_alerts_set_based()
+            else:
+                self._check_rules_in_memory()
+                self.writer.flush()
+        
+        logger.info(f"Alert check ({mode}) peak memory: {peak['mb']:.1f} MB")
     
-    def _check_validity_alerts(self):
+    def _check_all_alerts_set_based(self, incremental: Optional[bool] = None) -> List[int]:
         """
-        Vérifier les alertes de validité des offres
+        Évaluer toutes les règles en SQL: une requête INSERT ... SELECT par règle,
+        quel que soit le nombre de prêts
+        
+        En mode incrémental, seuls les prêts dont la prochaine échéance d'alerte est
+        passée ou qui ont changé depuis le dernier passage sont évalués
         """
-        active_loans = self.db.query(Loan).filter(
-            Loan.status.in_([LoanStatus.APPROVED, LoanStatus.IN_PROGRESS])
-        ).all()
+        if incremental is None:
+            incremental = settings.ALERT_INCREMENTAL_SCAN
         
-        for loan in active_loans:
-            days_remaining = (loan.validity_end_date - datetime.now()).days
-            
-            # Determine alert threshold based on loan type
-            if 'CLASSIQUE' in loan.loan_type:
-                orange_threshold = 40  # 2/3 of 60 days
-                red_threshold = 5
-            else:
-                orange_threshold = 60  # 2/3 of 90 days
-                red_threshold = 5
-            
-            if days_remaining <= red_threshold and days_remaining > 0:
-                self._create_alert(
-                    loan.id,
-                    AlertType.VALIDITY_CRITICAL,
-                    "RED",
-                    f"URGENT: L'offre de prêt expire dans {days_remaining} jours!"
-                )
-            elif days_remaining <= orange_threshold and days_remaining > red_threshold:
-                self._create_alert(
-                    loan.id,
-                    AlertType.VALIDITY_WARNING,
-                    "ORANGE",
-                    f"Attention: Il reste {days_remaining} jours avant l'expiration de l'offre"
-                )
+        scan_started_at, watermark = self.begin_scan()
+        alert_ids = self._run_set_based_scan(incremental, watermark if incremental else None)
+        
+        if incremental:
+            self.finish_scan(scan_started_at)
+        return alert_ids
     
-    def _check_disbursement_alerts(self):
-        """
-        Vérifier les alertes de déblocage
-        """
-        active_disbursements = self.db.query(Disbursement).join(Loan).filter(
-            Disbursement.status == DisbursementStatus.IN_PROGRESS,
-            Loan.status == LoanStatus.DISBURSING
-        ).all()
-        
-        for disbursement in active_disbursements:
-            loan = disbursement.loan
-            
-            # Check work progress vs time elapsed
-            if disbursement.request_date:
-                days_elapsed = (datetime.now() - disbursement.request_date).days
-                expected_completion = min(days_elapsed * 3, 100)  # 3% per day expected
-                
-                if disbursement.work_completion_percentage < expected_completion - 20:
-                    self._create_alert(
-                        loan.id,
-                        AlertType.WORK_DELAY_WARNING,
-                        "ORANGE",
-                        f"Retard constaté sur les travaux: {disbursement.work_completion_percentage}% réalisé"
-                    )
-    
-    def _check_repayment_alerts(self):
-        """
-        Vérifier les alertes de remboursement
-        """
-        loans_with_grace = self.db.query(Loan).filter(
-            Loan.status == LoanStatus.DISBURSING,
-            Loan.grace_period_months > 0,
-            Loan.first_payment_date.isnot(None)
-        ).all()
-        
-        for loan in loans_with_grace:
-            # Calculate end of grace period
-            grace_end = loan.first_payment_date + timedelta(days=30 * loan.grace_period_months)
-            days_until_payment = (grace_end - datetime.now()).days
-            
-            if days_until_payment <= 30 and days_until_payment > 0:
-                self._create_alert(
-                    loan.id,
-                    AlertType.REPAYMENT_UPCOMING,
-                    "ORANGE",
-                    f"Le remboursement commence dans {days_until_payment} jours"
-                )
-            elif days_until_payment <= 7 and days_until_payment > 0:
-                self._create_alert(
-                    loan.id,
-                    AlertType.REPAYMENT_IMMINENT,
-                    "RED",
-                    f"URGENT: Le remboursement commence dans {days_until_payment} jours!"
-                )
+    def check_alerts_shard(self, shard_index: int, shard_count: int,
+                           watermark: Optional[datetime] = None,
+                           incremental: Optional[bool] = None) -> int:
+        """
+        Évaluer une partition du portefeuille (Loan.id % shard_count == shard_index)
+        
+        Le filigrane est lu et écrit par la tâche coordinatrice, pas par les partitions
+        """
+        if incremental is None:
+            incremental = settings.ALERT_INCREMENTAL_SCAN
+        
+        alert_ids = self._run_set_based_scan(incremental, watermark, shard=(shard_index, shard_count))
+        return len(alert_ids)
+    
+    def begin_scan(self) -> Tuple[datetime, Optional[datetime]]:
+        """
+        Heure de début du scan (horloge de la base) et filigrane du scan précédent
+        """
+        return self.db.scalar(select(func.now())), self._get_scan_watermark()
+    
+    def finish_scan(self, scan_started_at: datetime):
+        """
+        Enregistrer le filigrane une fois le scan terminé avec succès
+        """
+        self._set_scan_watermark(scan_started_at)
+    
+    def _run_set_based_scan(self, incremental: bool, watermark: Optional[datetime],
+                            shard: Optional[Tuple[int, int]] = None) -> List[int]:
+        """
+        Exécuter les règles sur le périmètre (partition, prêts modifiés) puis
+        planifier les notifications des nouvelles alertes
+        """
+        scope = None
+        if shard is not None:
+            shard_index, shard_count = shard
+            scope = lambda column: column % shard_count == shard_index
+        
+        scanned = "all"
+        if incremental and watermark is not None:
+            changed = self._changed_loans(watermark, scope)
+            scanned = self.db.scalar(select(func.count()).select_from(changed.subquery()))
+            # The rules re-run the (index-driven) change query as a subquery
+            scope = lambda column: column.in_(changed)
+        
+        alert_ids = []
+        if scanned:
+            alert_ids += self._insert_rule_alerts(scope)
+            if incremental:
+                self._schedule_next_checks(scope)
+        # Alerts and their outbox rows are committed together: the scan never waits on the broker
+        self.db.commit()
+        
+        shard_label = f", shard {shard[0]}/{shard[1]}" if shard is not None else ""
+        logger.info(f"✅ {len(alert_ids)} alerts created (set-based{shard_label}, {scanned} loans scanned) and notifications queued")
+        return alert_ids
+    
+    @staticmethod
+    def _get_scan_watermark() -> Optional[datetime]:
+        """
+        Date de début du dernier scan incrémental réussi (None: scan complet)
+        """
+        value = get_redis().get(SCAN_WATERMARK_KEY)
+        return datetime.fromisoformat(value) if value else None
+    
+    @staticmethod
+    def _set_scan_watermark(value: datetime):
+        get_redis().set(SCAN_WATERMARK_KEY, value.isoformat())
+    
+    def _changed_loans(self, watermark: datetime, scope: ScanScope = None):
+        """
+        Prêts à réévaluer: échéance d'alerte atteinte, prêt ou déblocage modifié,
+        ou alerte résolue depuis le dernier passage
+        
+        Une branche par marqueur, chacune servie par son index: le coût suit le
+        nombre de changements et non la taille du portefeuille
+        """
+        since = watermark - timedelta(seconds=settings.ALERT_SCAN_WATERMARK_OVERLAP_SECONDS)
+        return union(
+            select(Loan.id).where(Loan.next_alert_at <= func.now(), in_scope(Loan.id, scope)),
+            select(Loan.id).where(Loan.created_at > since, in_scope(Loan.id, scope)),
+            select(Loan.id).where(Loan.updated_at > since, in_scope(Loan.id, scope)),
+            select(Disbursement.loan_id).where(Disbursement.created_at > since, in_scope(Disbursement.loan_id, scope)),
+            select(Disbursement.loan_id).where(Disbursement.updated_at > since, in_scope(Disbursement.loan_id, scope)),
+            select(Alert.loan_id).where(Alert.resolved_at > since, in_scope(Alert.loan_id, scope))
+        )
+    
+    def _insert_alerts_from_select(self, alert_type: AlertType, severity: str, query) -> List[int]:
+        """
+        Insérer en une seule requête les alertes sélectionnées (loan_id, message)
+        et leurs lignes d'outbox
+        """
+        rows = select(
+            query.c.loan_id,
+            literal(alert_type, Alert.alert_type.type),
+            literal(severity),
+            query.c.message
+        )
+        # NOT EXISTS filters most duplicates up front, ON CONFLICT covers concurrent scans
+        stmt = insert(Alert).from_select(
+            ["loan_id", "alert_type", "severity", "message"], rows
+        ).on_conflict_do_nothing(**OPEN_ALERT_CONFLICT)
+        return list(self.db.scalars(with_outbox(stmt)))
+    
+    def _insert_rule_alerts(self, scope: ScanScope = None) -> List[int]:
+        """
+        Une requête INSERT ... SELECT par règle du registre
+        """
+        alert_ids = []
+        for rule in ALERT_RULES:
+            alert_ids += self._insert_alerts_from_select(rule.alert_type, rule.severity, rule.candidates(scope))
+        return alert_ids
+    
+    def _schedule_next_checks(self, scope: ScanScope = None):
+        """
+        Recalculer Loan.next_alert_at: prochaine date à laquelle un seuil est franchi
+        (orange, rouge, fin de différé, point de contrôle des travaux)
+        """
+        next_alert_at = func.least(*(rule.next_check() for rule in ALERT_RULES))
+        
+        self.db.execute(
+            update(Loan)
+            .where(in_scope(Loan.id, scope))
+            # Keep updated_at untouched: it is the change marker of the incremental scan
+            .values(next_alert_at=next_alert_at, updated_at=Loan.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+    
+    def _check_rules_in_memory(self):
+        """
+        Évaluer les règles du registre en mémoire, par lots vectorisés (NumPy)
+        sur un curseur côté serveur
+        """
+        now = np_now()
+        for source, query in (("loan", loan_columns_query()), ("disbursement", disbursement_columns_query())):
+            rules = RULES_BY_SOURCE[source]
+            result = self.db.execute(query.execution_options(yield_per=SCAN_BATCH_SIZE))
+            for batch in result.partitions():
+                columns = to_columns(batch, source)
+                for rule in rules:
+                    mask, values = rule.evaluate(columns, now)
+                    for loan_id, value in zip(columns["loan_id"][mask], values[mask]):
+                        self._create_alert(int(loan_id), rule.alert_type, rule.severity, rule.format_message(value))
     
     def _create_alert(self, loan_id: int, alert_type: AlertType, severity: str, message: str):
         """
-        Créer une alerte si elle n'existe pas déjà
+        Mettre en attente une alerte; elle est écrite au flush du scan
+        si aucune alerte non résolue du même type n'existe déjà
         """
-        existing = self.db.query(Alert).filter(
-            Alert.loan_id == loan_id,
-            Alert.alert_type == alert_type,
-            Alert.status != AlertStatus.RESOLVED
-        ).first()
+        self.writer.add(loan_id, alert_type, severity, message)
+    
+    def escalate_due_alerts(self) -> List[int]:
+        """
+        Escalader les alertes dont l'échéance est passée (lues dans le ZSET Redis,
+        sans parcourir la table alerts) et renvoyer les ids escaladés
+        """
+        due_ids = self.escalations.pop_due()
+        if not due_ids:
+            return []
         
-        if not existing:
-            alert = Alert(
-                loan_id=loan_id,
-                alert_type=alert_type,
-                severity=severity,
-                message=message
-            )
-            self.db.add(alert)
+        try:
+            # Alerts resolved (or already escalated) since they were scheduled are skipped
+            escalated_ids = list(self.db.scalars(with_outbox(
+                update(Alert)
+                .where(
+                    Alert.id.in_(due_ids),
+                    Alert.status.in_([AlertStatus.PENDING, AlertStatus.ACKNOWLEDGED])
+                )
+                .values(status=AlertStatus.ESCALATED),
+                OutboxEvent.ALERT_ESCALATED
+            )))
             self.db.commit()
-            
-            # Import here to avoid circular imports
-            from app.tasks import send_alert_notifications
-            
-            # Schedule notification using Celery task
-            send_alert_notifications.delay(alert.id)
-            logger.info(f"✅ Alert {alert.id} created and notification scheduled")
+        except Exception:
+            self.db.rollback()
+            # Put the popped entries back so the next tick retries them
+            self.escalations.requeue(due_ids)
+            raise
+        
+        logger.info(f"⏫ {len(escalated_ids)} alerts escalated ({len(due_ids)} due)")
+        return escalated_ids
     
     def get_alerts_summary(self) -> Dict:
         """
         Obtenir un résumé des alertes actives
+        
+        Une seule requête GROUP BY GROUPING SETS calcule le total et les trois
+        ventilations (sévérité, type, statut)
         """
-        alerts = self.db.query(Alert).filter(
-            Alert.status.in_([AlertStatus.PENDING, AlertStatus.ACKNOWLEDGED])
-        ).all()
+        rows = self.db.execute(
+            select(
+                Alert.severity,
+                Alert.alert_type,
+                Alert.status,
+                func.grouping(Alert.severity, Alert.alert_type, Alert.status).label("grouping_id"),
+                func.count().label("count")
+            ).where(
+                Alert.status.in_([AlertStatus.PENDING, AlertStatus.ACKNOWLEDGED, AlertStatus.ESCALATED])
+            ).group_by(
+                func.grouping_sets(
+                    tuple_(Alert.severity),
+                    tuple_(Alert.alert_type),
+                    tuple_(Alert.status),
+                    text("()")
+                )
+            )
+        )
         
         summary = {
-            "total": len(alerts),
+            "total": 0,
             "by_severity": {
-                "RED": len([a for a in alerts if a.severity == "RED"]),
-                "ORANGE": len([a for a in alerts if a.severity == "ORANGE"])
+                "RED": 0,
+                "ORANGE": 0
             },
             "by_type": {},
             "by_status": {}
         }
         
-        for alert in alerts:
-            # Count by type
-            alert_type = alert.alert_type.value
-            summary["by_type"][alert_type] = summary["by_type"].get(alert_type, 0) + 1
-            
-            # Count by status
-            status = alert.status.value
-            summary["by_status"][status] = summary["by_status"].get(status, 0) + 1
+        # GROUPING() bitmask: a bit is set for each column that is not grouped on
+        for row in rows:
+            if row.grouping_id == GROUPED_BY_SEVERITY:
+                summary["by_severity"][row.severity] = row.count
+            elif row.grouping_id == GROUPED_BY_TYPE:
+                summary["by_type"][row.alert_type.value] = row.count
+            elif row.grouping_id == GROUPED_BY_STATUS:
+                summary["by_status"][row.status.value] = row.count
+            else:
+                summary["total"] = row.count
         
         return summary
     
@@ -179,6 +335,7 @@ class AlertService:
                 alert.status = AlertStatus.RESOLVED
                 alert.resolved_at = datetime.now()
                 self.db.commit()
+                self.escalations.cancel(alert_id)
                 logger.info(f"Alert {alert_id} marked as resolved")
                 return True
             else:
@@ -198,6 +355,8 @@ class AlertService:
                 alert.status = AlertStatus.ACKNOWLEDGED
                 alert.acknowledged_at = datetime.now()
                 self.db.commit()
+                # Restart the escalation clock with the acknowledged delay
+                self.escalations.schedule([(alert_id, alert.severity)], acknowledged=True)
                 logger.info(f"Alert {alert_id} acknowledged")
                 return True
             else:
@@ -0,0 +1,210 @@
+# ============================
+# backend/app/services/alert_simulation.py
+# ============================
+"""
+Simulation « what-if » des alertes sur l'ensemble du portefeuille.
+
+Les colonnes utiles des prêts et déblocages sont chargées une seule fois en
+tableaux NumPy, puis chaque règle du registre est évaluée pour chaque jour de
+l'horizon avec d'éventuels seuils modifiés. Aucune alerte n'est écrite.
+
+Usage: python -m app.services.alert_simulation --days 60 --set RENTAL_ORDINARY.validity_orange_days=45
+"""
+from dataclasses import fields, replace
+from typing import Dict, List, Optional
+import argparse
+import json
+import time
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import Alert, AlertStatus, LoanType
+from app.services.alert_rules import (
+    ALERT_RULES,
+    DAY,
+    LOAN_TYPE_POLICIES,
+    LoanTypePolicy,
+    disbursement_columns_query,
+    loan_columns_query,
+    np_now,
+    to_columns,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Overrides keyed by "*" apply to every loan type
+ALL_LOAN_TYPES = "*"
+POLICY_FIELDS = {policy_field.name for policy_field in fields(LoanTypePolicy)}
+
+
+def apply_policy_overrides(overrides: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[LoanType, LoanTypePolicy]:
+    """
+    Seuils par type de prêt après application des modifications proposées
+    ({"RENTAL_ORDINARY": {"validity_orange_days": 45}, "*": {...}})
+    """
+    policies = dict(LOAN_TYPE_POLICIES)
+    for key, changes in (overrides or {}).items():
+        unknown = set(changes) - POLICY_FIELDS
+        if unknown:
+            raise ValueError(f"Seuil inconnu: {', '.join(sorted(unknown))}")
+        if key == ALL_LOAN_TYPES:
+            loan_types = list(LoanType)
+        elif key in LoanType.__members__:
+            loan_types = [LoanType[key]]
+        else:
+            raise ValueError(f"Type de prêt inconnu: {key}")
+        for loan_type in loan_types:
+            policies[loan_type] = replace(policies[loan_type], **changes)
+    return policies
+
+
+class AlertSimulationService:
+    def __init__(self, db: Session):
+        self.db = db
+        self._portfolio: Optional[Dict[str, Dict[str, np.ndarray]]] = None
+        self._open_alerts: Optional[Dict[str, np.ndarray]] = None
+
+    def load_portfolio(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Charger une seule fois les colonnes des prêts et déblocages en tableaux NumPy
+        """
+        if self._portfolio is None:
+            self._portfolio = {
+                "loan": to_columns(self.db.execute(loan_columns_query()).all(), "loan"),
+                "disbursement": to_columns(self.db.execute(disbursement_columns_query()).all(), "disbursement"),
+            }
+        return self._portfolio
+
+    def load_open_alerts(self) -> Dict[str, np.ndarray]:
+        """
+        Prêts ayant déjà une alerte non résolue, par type d'alerte
+        """
+        if self._open_alerts is None:
+            rows = self.db.execute(
+                select(Alert.loan_id, Alert.alert_type).where(Alert.status != AlertStatus.RESOLVED)
+            ).all()
+            self._open_alerts = {
+                alert_type.value: np.array(
+                    [row.loan_id for row in rows if row.alert_type == alert_type], dtype=np.int64
+                )
+                for alert_type in {rule.alert_type for rule in ALERT_RULES}
+            }
+        return self._open_alerts
+
+    def simulate(self, horizon_days: int = 30,
+                 overrides: Optional[Dict[str, Dict[str, int]]] = None,
+                 include_open: bool = False) -> Dict:
+        """
+        Histogramme par jour et par type des alertes qu'un jeu de seuils générerait
+
+        Un couple prêt/type n'est compté qu'une fois, le premier jour où la règle se
+        déclenche; les prêts ayant déjà une alerte ouverte sont ignorés sauf si
+        include_open est vrai
+        """
+        started = time.perf_counter()
+        policies = apply_policy_overrides(overrides)
+        portfolio = self.load_portfolio()
+        open_alerts = {} if include_open else self.load_open_alerts()
+        today = np_now()
+
+        alert_types = [rule.alert_type.value for rule in ALERT_RULES]
+        new_alerts = np.zeros((horizon_days + 1, len(ALERT_RULES)), dtype=np.int64)
+        active_alerts = np.zeros_like(new_alerts)
+
+        for index, rule in enumerate(ALERT_RULES):
+            columns = portfolio[rule.metric.source]
+            # Row filters do not depend on the date: apply them once for the whole horizon
+            rows = rule.metric.np_filters(columns)
+            columns = {name: values[rows] for name, values in columns.items()}
+            # Position of each row in the list of distinct loans, so that several
+            # disbursements of one loan only count once
+            loan_ids, positions = np.unique(columns["loan_id"], return_inverse=True)
+            already_alerted = np.isin(loan_ids, open_alerts.get(rule.alert_type.value, []))
+
+            for day in range(horizon_days + 1):
+                mask, _ = rule.evaluate(columns, today + day * DAY, policies)
+                triggered = np.zeros(len(loan_ids), dtype=bool)
+                triggered[positions[mask]] = True
+
+                active_alerts[day, index] = np.count_nonzero(triggered)
+                triggered &= ~already_alerted
+                new_alerts[day, index] = np.count_nonzero(triggered)
+                already_alerted |= triggered
+
+        day_dates = today.astype("datetime64[D]") + np.arange(horizon_days + 1)
+        days = [
+            {
+                "date": str(day_dates[day]),
+                "new": dict(zip(alert_types, new_alerts[day].tolist())),
+                "active": dict(zip(alert_types, active_alerts[day].tolist())),
+            }
+            for day in range(horizon_days + 1)
+        ]
+
+        totals = dict(zip(alert_types, new_alerts.sum(axis=0).tolist()))
+        by_severity = {"RED": 0, "ORANGE": 0}
+        for rule in ALERT_RULES:
+            by_severity[rule.severity] += totals[rule.alert_type.value]
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Alert simulation over {horizon_days} days: {sum(totals.values())} alerts in {elapsed_ms:.0f} ms")
+
+        return {
+            "horizon_days": horizon_days,
+            "loans": len(portfolio["loan"]["loan_id"]),
+            "days": days,
+            "totals": totals,
+            "by_severity": by_severity,
+            "elapsed_ms": round(elapsed_ms, 1),
+        }
+
+
+def parse_override(value: str) -> tuple:
+    """
+    TYPE.champ=valeur (TYPE: type de prêt ou *)
+    """
+    try:
+        target, amount = value.split("=", 1)
+        loan_type, name = target.rsplit(".", 1)
+        return loan_type, name, int(amount)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Format attendu TYPE.champ=valeur: {value}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Simuler les alertes générées par un jeu de seuils")
+    parser.add_argument("--days", type=int, default=30, help="Horizon de simulation en jours")
+    parser.add_argument("--set", dest="overrides", type=parse_override, action="append", default=[],
+                        metavar="TYPE.champ=valeur", help="Modifier un seuil (TYPE: type de prêt ou *)")
+    parser.add_argument("--include-open", action="store_true", help="Compter aussi les prêts déjà alertés")
+    parser.add_argument("--json", action="store_true", help="Afficher le résultat complet en JSON")
+    args = parser.parse_args(argv)
+
+    overrides: Dict[str, Dict[str, int]] = {}
+    for loan_type, name, amount in args.overrides:
+        overrides.setdefault(loan_type, {})[name] = amount
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        result = AlertSimulationService(db).simulate(args.days, overrides, args.include_open)
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"Simulation sur {result['horizon_days']} jours ({result['loans']} prêts, {result['elapsed_ms']} ms)")
+    for day in result["days"]:
+        if any(day["new"].values()):
+            counts = ", ".join(f"{alert_type}={count}" for alert_type, count in day["new"].items() if count)
+            print(f"  {day['date']}: {counts}")
+    print(f"Total: {result['totals']}")
+    print(f"Par sévérité: {result['by_severity']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# ============================
+# backend/app/services/alert_writer.py
+# ============================
+from typing import List, Dict, Tuple
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import Alert, AlertType
+from app.models.alert import OPEN_ALERT_CONFLICT
+from app.services.notification_outbox import with_outbox
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AlertWriter:
+    """
+    Collecte les alertes créées pendant un scan et les écrit en une seule transaction
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._pending: Dict[Tuple[int, AlertType], Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, loan_id: int, alert_type: AlertType, severity: str, message: str):
+        """
+        Mettre une alerte en attente (une seule par couple prêt/type)
+        """
+        self._pending.setdefault((loan_id, alert_type), {
+            "loan_id": loan_id,
+            "alert_type": alert_type,
+            "severity": severity,
+            "message": message,
+        })
+
+    def flush(self) -> List[int]:
+        """
+        Insérer les alertes en attente et leurs lignes d'outbox en une seule requête,
+        puis valider une seule fois (les notifications partent via le dispatcher)
+        """
+        if not self._pending:
+            return []
+
+        rows = list(self._pending.values())
+        self._pending.clear()
+
+        # Loans that already have an open alert of the same type hit the partial
+        # unique index and are skipped: only new alerts get an outbox row
+        stmt = with_outbox(insert(Alert).values(rows).on_conflict_do_nothing(**OPEN_ALERT_CONFLICT))
+        alert_ids = list(self.db.scalars(stmt))
+        self.db.commit()
+
+        logger.info(f"✅ {len(alert_ids)} alerts created and notifications queued")
+        return alert_ids
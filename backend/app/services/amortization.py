@@ -0,0 +1,216 @@
+# ============================
+# backend/app/services/amortization.py
+# ============================
+"""
+Tableaux d'amortissement (échéances constantes).
+
+Les mois de différé (grace_period_months) précèdent l'amortissement: seuls les
+intérêts sont payés, puis duration_months échéances constantes égales à
+Loan.monthly_payment remboursent le capital.
+
+- preview_schedule: calcul vectorisé NumPy (float64), pour l'affichage et les
+  simulations (moins d'une milliseconde pour 360 mois); comme le tableau exact,
+  il applique l'échéance arrondie au centime et solde le capital à la dernière
+- price_loans: échéance et coût total de nombreux scénarios à la fois
+  (simulation de prêts)
+- exact_schedule: passe de réconciliation en Decimal pour la persistance:
+  échéance et intérêts arrondis au centime, la dernière échéance absorbe les
+  arrondis pour que le capital remboursé soit exactement le montant du prêt
+
+Microbenchmark: python -m app.services.amortization
+"""
+from typing import Dict, List, Optional
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from dateutil.relativedelta import relativedelta
+import numpy as np
+
+CENT = Decimal("0.01")
+SCHEDULE_COLUMNS = ("payment", "interest", "principal", "balance")
+
+
+def monthly_rate(annual_rate) -> Decimal:
+    return Decimal(str(annual_rate)) / 100 / 12
+
+
+def monthly_payment(amount, annual_rate, duration_months: int) -> Decimal:
+    """
+    Échéance constante (formule de create_loan, non arrondie)
+    """
+    amount = Decimal(str(amount))
+    rate = monthly_rate(annual_rate)
+    if rate > 0:
+        return amount * (rate * (1 + rate) ** duration_months) / ((1 + rate) ** duration_months - 1)
+    return amount / duration_months
+
+
+def price_loans(amounts, annual_rates, durations, grace_periods=None) -> Dict[str, np.ndarray]:
+    """
+    Formule de monthly_payment appliquée à des tableaux de scénarios (float64),
+    avec le coût des mois de différé (intérêts seuls); les totaux suivent
+    exact_schedule: échéances arrondies au centime, la dernière solde le capital
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    rates = np.asarray(annual_rates, dtype=np.float64) / 100 / 12
+    durations = np.asarray(durations, dtype=np.float64)
+    graces = np.zeros_like(amounts) if grace_periods is None else np.asarray(grace_periods, dtype=np.float64)
+
+    growth = (1 + rates) ** durations
+    before_last = (1 + rates) ** (durations - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payments = np.round(np.where(
+            rates > 0,
+            amounts * rates * growth / (growth - 1),
+            amounts / durations
+        ), 2)
+        # Capital left before the last installment, which repays it with its interest
+        balance = np.where(
+            rates > 0,
+            amounts * before_last - payments * (before_last - 1) / rates,
+            amounts - payments * (durations - 1)
+        )
+    total_paid = payments * (durations - 1) + balance * (1 + rates) + np.round(amounts * rates, 2) * graces
+    return {
+        "monthly_payment": payments,
+        "total_paid": np.round(total_paid, 2),
+        "total_interest": np.round(total_paid - amounts, 2),
+    }
+
+
+def due_dates(first_payment_date: Optional[datetime], periods: int) -> List[Optional[date]]:
+    """
+    Dates d'échéance mensuelles à partir de la première (inconnues sans first_payment_date)
+    """
+    if first_payment_date is None:
+        return [None] * periods
+    start = first_payment_date.date() if isinstance(first_payment_date, datetime) else first_payment_date
+    return [start + relativedelta(months=period) for period in range(periods)]
+
+
+def preview_schedule(amount, annual_rate, duration_months: int,
+                     grace_period_months: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Colonnes du tableau (une ligne par mois, différé compris) calculées sans boucle:
+    le capital restant après k échéances est P(1+r)^k - A((1+r)^k - 1)/r
+    """
+    amount = float(amount)
+    rate = float(annual_rate) / 100 / 12
+    grace = grace_period_months or 0
+
+    if rate > 0:
+        growth = (1 + rate) ** np.arange(duration_months + 1)
+        payment = round(amount * rate * growth[-1] / (growth[-1] - 1), 2)
+        balance = amount * growth - payment * (growth - 1) / rate
+    else:
+        payment = round(amount / duration_months, 2)
+        balance = amount - payment * np.arange(duration_months + 1)
+
+    payments = np.full(duration_months, payment)
+    # Last installment: repay the remaining capital, rounding included
+    payments[-1] = balance[-2] * (1 + rate)
+    balance[-1] = 0.0
+
+    interest = balance[:-1] * rate
+    columns = {
+        "payment": payments,
+        "interest": interest,
+        "principal": payments - interest,
+        "balance": balance[1:],
+    }
+    if grace:
+        grace_interest = np.full(grace, round(amount * rate, 2))
+        columns = {
+            "payment": np.concatenate([grace_interest, columns["payment"]]),
+            "interest": np.concatenate([grace_interest, columns["interest"]]),
+            "principal": np.concatenate([np.zeros(grace), columns["principal"]]),
+            "balance": np.concatenate([np.full(grace, amount), columns["balance"]]),
+        }
+    columns["period"] = np.arange(1, grace + duration_months + 1)
+    return columns
+
+
+def preview_lines(amount, annual_rate, duration_months: int, grace_period_months: int = 0,
+                  first_payment_date: Optional[datetime] = None) -> List[Dict]:
+    columns = preview_schedule(amount, annual_rate, duration_months, grace_period_months)
+    rounded = {name: np.round(columns[name], 2).tolist() for name in SCHEDULE_COLUMNS}
+    dates = due_dates(first_payment_date, len(columns["period"]))
+    return [
+        {"period": period, "due_date": dates[index], **{name: rounded[name][index] for name in SCHEDULE_COLUMNS}}
+        for index, period in enumerate(columns["period"].tolist())
+    ]
+
+
+def exact_schedule(amount, annual_rate, duration_months: int, grace_period_months: int = 0,
+                   first_payment_date: Optional[datetime] = None) -> List[Dict]:
+    """
+    Tableau en Decimal, arrondi au centime, pour la persistance
+    """
+    amount = Decimal(str(amount)).quantize(CENT, ROUND_HALF_UP)
+    rate = monthly_rate(annual_rate)
+    grace = grace_period_months or 0
+    installment = monthly_payment(amount, annual_rate, duration_months).quantize(CENT, ROUND_HALF_UP)
+    dates = due_dates(first_payment_date, grace + duration_months)
+
+    lines = []
+    balance = amount
+    for index in range(grace + duration_months):
+        interest = (balance * rate).quantize(CENT, ROUND_HALF_UP)
+        if index < grace:
+            principal = Decimal("0.00")
+        elif index == grace + duration_months - 1:
+            # Last installment: repay the remaining capital, rounding included
+            principal = balance
+        else:
+            principal = min(installment - interest, balance)
+        balance -= principal
+        lines.append({
+            "period": index + 1,
+            "due_date": dates[index],
+            "payment": principal + interest,
+            "interest": interest,
+            "principal": principal,
+            "balance": balance,
+        })
+    return lines
+
+
+def schedule_totals(lines: List[Dict]) -> Dict:
+    """
+    Totaux d'un tableau (aperçu float arrondi au centime, ou Decimal exact)
+    """
+    totals = {
+        "total_paid": sum(line["payment"] for line in lines),
+        "total_interest": sum(line["interest"] for line in lines),
+    }
+    return {name: round(total, 2) if isinstance(total, float) else total for name, total in totals.items()}
+
+
+def main():
+    import timeit
+
+    amount, rate, duration, grace = Decimal("25000000"), Decimal("7.50"), 360, 6
+    number = 2000
+    seconds = timeit.timeit(lambda: preview_schedule(amount, rate, duration, grace), number=number) / number
+    print(f"NumPy preview: {seconds * 1e6:.1f} µs for {grace + duration} months")
+
+    number = 100
+    seconds = timeit.timeit(lambda: exact_schedule(amount, rate, duration, grace), number=number) / number
+    print(f"Decimal reconciliation: {seconds * 1e3:.2f} ms for {grace + duration} months")
+
+    scenarios = 10000
+    rng = np.random.default_rng(0)
+    amounts = rng.uniform(1e6, 1e8, scenarios)
+    rates = rng.uniform(4, 12, scenarios)
+    durations = rng.integers(12, 361, scenarios)
+    number = 100
+    seconds = timeit.timeit(lambda: price_loans(amounts, rates, durations), number=number) / number
+    print(f"Pricing: {seconds * 1e3:.2f} ms for {scenarios} scenarios")
+
+    lines = exact_schedule(amount, rate, duration, grace)
+    preview = preview_schedule(amount, rate, duration, grace)
+    gap = max(abs(float(line["balance"]) - balance) for line, balance in zip(lines, preview["balance"]))
+    print(f"Capital repaid: {sum(line['principal'] for line in lines)} / {amount}, max preview gap: {gap:.2f}")
+
+
+if __name__ == "__main__":
+    main()
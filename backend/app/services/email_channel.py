@@ -0,0 +1,173 @@
+# ============================
+# backend/app/services/email_channel.py
+# ============================
+"""
+Canal email SMTP asynchrone.
+
+Chaque worker garde un pool de connexions SMTP authentifiées et persistantes
+(SMTP_POOL_SIZE), utilisé depuis une boucle asyncio dédiée: les envois d'un lot
+sont concurrents et chaque connexion enchaîne plusieurs messages sans se
+reconnecter.
+"""
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+import aiosmtplib
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (to_email, subject, body)
+OutgoingEmail = Tuple[str, str, str]
+
+
+class SMTPConnectionPool:
+    """
+    Pool de connexions SMTP persistantes (à utiliser depuis une seule boucle asyncio)
+    """
+
+    def __init__(self, size: int, hostname: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, start_tls: bool = True, timeout: float = 30):
+        self.size = size
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password or "")
+        return smtp
+
+    async def acquire(self) -> Optional[aiosmtplib.SMTP]:
+        """
+        Connexion libre du pool (None: emplacement libre à connecter)
+        """
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait(None)
+        return await self._idle.get()
+
+    def release(self, smtp: Optional[aiosmtplib.SMTP]):
+        self._idle.put_nowait(smtp)
+
+    async def send(self, message: EmailMessage):
+        smtp = await self.acquire()
+        try:
+            if smtp is None or not smtp.is_connected:
+                smtp = await self._connect()
+            try:
+                await smtp.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                # The server dropped an idle connection: reconnect once and retry
+                smtp = await self._connect()
+                await smtp.send_message(message)
+        except Exception:
+            if smtp is not None:
+                smtp.close()
+            smtp = None
+            raise
+        finally:
+            self.release(smtp)
+
+    async def close(self):
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            smtp = self._idle.get_nowait()
+            if smtp is not None and smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except aiosmtplib.SMTPException:
+                    smtp.close()
+        self._idle = None
+
+
+class EmailChannel:
+    """
+    Envoi d'emails par lots depuis du code synchrone (tâches Celery)
+    """
+
+    def __init__(self, pool: Optional[SMTPConnectionPool] = None):
+        self.pool = pool or SMTPConnectionPool(
+            size=settings.SMTP_POOL_SIZE,
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER,
+            password=settings.SMTP_PASSWORD,
+            start_tls=settings.SMTP_TLS,
+            timeout=settings.SMTP_TIMEOUT,
+        )
+        # The pool's connections live on this loop, which outlives each task
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="smtp-channel", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def build_message(to_email: str, subject: str, body: str) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL or settings.SMTP_USER))
+        message["To"] = to_email
+        message["Subject"] = subject
+        message.set_content(body)
+        return message
+
+    async def _send_all(self, emails: List[OutgoingEmail]) -> List[bool]:
+        results = await asyncio.gather(
+            *(self.pool.send(self.build_message(*email)) for email in emails),
+            return_exceptions=True
+        )
+        for (to_email, _, _), result in zip(emails, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to send email to {to_email}: {result}")
+        return [not isinstance(result, Exception) for result in results]
+
+    def send_many(self, emails: List[OutgoingEmail]) -> List[bool]:
+        """
+        Envoyer un lot d'emails en parallèle sur le pool; un booléen par email
+        """
+        if not emails:
+            return []
+        return asyncio.run_coroutine_threadsafe(self._send_all(emails), self._loop).result()
+
+    def send(self, to_email: str, subject: str, body: str) -> bool:
+        return self.send_many([(to_email, subject, body)])[0]
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.pool.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_channel: Optional[EmailChannel] = None
+_channel_pid: Optional[int] = None
+
+
+def get_email_channel() -> Optional[EmailChannel]:
+    """
+    Canal email du processus (None si SMTP_HOST n'est pas configuré)
+
+    Recréé après un fork: les connexions et la boucle ne sont pas partagées
+    entre les processus du worker Celery
+    """
+    global _channel, _channel_pid
+    if not settings.SMTP_HOST:
+        return None
+    if _channel is None or _channel_pid != os.getpid():
+        _channel = EmailChannel()
+        _channel_pid = os.getpid()
+    return _channel
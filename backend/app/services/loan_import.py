@@ -0,0 +1,274 @@
+# ============================
+# backend/app/services/loan_import.py
+# ============================
+"""
+Import en masse de prêts depuis un fichier CSV ou Excel (.xlsx).
+
+Les lignes sont lues en flux et traitées par paquets: validation LoanCreate,
+vérification des clients en une requête, un bloc de numéros de prêt par paquet,
+puis insertion des prêts (INSERT multi-lignes, executemany) et de leurs alertes
+de validité avec leurs lignes d'outbox, et un commit par paquet. Une ligne
+invalide est rapportée avec son numéro sans bloquer les autres.
+
+CLI: python -m app.services.loan_import portefeuille.csv [--errors erreurs.csv]
+"""
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
+import argparse
+import csv
+import logging
+import os
+import sys
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Alert, AlertType, Client, Loan, LoanType
+from app.schemas.loan import LoanCreate
+from app.services import amortization
+from app.services.alert_rules import LOAN_TYPE_POLICIES
+from app.services.loan_numbers import LoanNumberAllocator
+from app.services.notification_outbox import with_outbox
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = (".csv", ".xlsx")
+
+# (file line number, raw values by column name)
+ImportRow = Tuple[int, Dict[str, object]]
+
+
+def iter_csv_rows(path: str) -> Iterator[ImportRow]:
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        sample = file.read(4096)
+        file.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        for line_number, row in enumerate(csv.DictReader(file, dialect=dialect), start=2):
+            if any(value and value.strip() for value in row.values() if isinstance(value, str)):
+                yield line_number, row
+
+
+def iter_excel_rows(path: str) -> Iterator[ImportRow]:
+    """
+    Lignes de la première feuille, la première ligne donnant les noms de colonnes
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ValueError("Excel import requires openpyxl") from e
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(name).strip() if name is not None else "" for name in next(rows, ())]
+        for line_number, values in enumerate(rows, start=2):
+            if any(value is not None for value in values):
+                yield line_number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_rows(path: str) -> Iterator[ImportRow]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return iter_csv_rows(path)
+    if extension == ".xlsx":
+        return iter_excel_rows(path)
+    raise ValueError(f"Unsupported import format: {extension} (expected {', '.join(IMPORT_FORMATS)})")
+
+
+def clean_row(row: Dict[str, object]) -> Dict[str, object]:
+    """
+    Valeurs brutes vers les champs de LoanCreate: cellules vides ignorées, nombres
+    Excel en texte (Decimal exact), types de prêt acceptés par nom ou par valeur
+    """
+    cleaned = {}
+    for name, value in row.items():
+        name = (name or "").strip()
+        if isinstance(value, str):
+            value = value.strip()
+        if not name or value is None or value == "":
+            continue
+        if isinstance(value, float):
+            value = int(value) if value.is_integer() else repr(value)
+        cleaned[name] = value
+
+    if "client_number" in cleaned:
+        cleaned["client_number"] = str(cleaned["client_number"])
+    loan_type = cleaned.get("loan_type")
+    if isinstance(loan_type, str) and loan_type in LoanType.__members__:
+        cleaned["loan_type"] = LoanType[loan_type].value
+    return cleaned
+
+
+class LoanImporter:
+    def __init__(self, db: Session, chunk_size: Optional[int] = None, agency_code: Optional[str] = None,
+                 progress: Optional[Callable[[Dict], None]] = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.LOAN_IMPORT_CHUNK_SIZE
+        self.agency_code = agency_code
+        self.progress = progress
+        self.numbers = LoanNumberAllocator(db)
+
+    def run(self, rows: Iterable[ImportRow], max_errors: Optional[int] = None) -> Dict:
+        """
+        Importer toutes les lignes; renvoie les compteurs et les premières erreurs
+        """
+        max_errors = settings.LOAN_IMPORT_MAX_ERRORS if max_errors is None else max_errors
+        report = {"processed": 0, "imported": 0, "failed": 0, "errors": []}
+        start = datetime.now()
+
+        chunk: List[ImportRow] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._run_chunk(chunk, report, max_errors)
+                chunk = []
+        if chunk:
+            self._run_chunk(chunk, report, max_errors)
+
+        report["elapsed_seconds"] = round((datetime.now() - start).total_seconds(), 2)
+        logger.info(
+            f"Loan import: {report['imported']} imported, {report['failed']} failed "
+            f"in {report['elapsed_seconds']} s"
+        )
+        return report
+
+    def _run_chunk(self, chunk: List[ImportRow], report: Dict, max_errors: int):
+        valid, errors = self._validate(chunk)
+        if valid:
+            try:
+                self._insert(valid)
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Loan import chunk failed: {str(e)}")
+                errors += [(line_number, [str(e).splitlines()[0]]) for line_number, _ in valid]
+                valid = []
+
+        report["processed"] += len(chunk)
+        report["imported"] += len(valid)
+        report["failed"] += len(errors)
+        room = max(max_errors - len(report["errors"]), 0)
+        report["errors"] += [{"row": line_number, "errors": messages} for line_number, messages in errors[:room]]
+        if self.progress:
+            self.progress({name: report[name] for name in ("processed", "imported", "failed")})
+
+    def _validate(self, chunk: List[ImportRow]):
+        """
+        Valider un paquet contre LoanCreate; clients vérifiés (ou résolus par
+        client_number) en une seule requête
+        """
+        cleaned = [(line_number, clean_row(row)) for line_number, row in chunk]
+        client_numbers = {row["client_number"] for _, row in cleaned if "client_number" in row}
+        client_ids = {
+            str(row["client_id"]) for _, row in cleaned if "client_id" in row
+        }
+        by_number = dict(self.db.execute(
+            select(Client.client_number, Client.id).where(Client.client_number.in_(client_numbers))
+        ).all()) if client_numbers else {}
+        known_ids = set(self.db.scalars(
+            select(Client.id).where(Client.id.in_([int(i) for i in client_ids if i.isdigit()]))
+        ).all()) if client_ids else set()
+
+        valid: List[Tuple[int, LoanCreate]] = []
+        errors: List[Tuple[int, List[str]]] = []
+        for line_number, row in cleaned:
+            client_number = row.pop("client_number", None)
+            resolved = "client_id" not in row and client_number is not None
+            if resolved:
+                if client_number not in by_number:
+                    errors.append((line_number, [f"client_number: unknown client {client_number}"]))
+                    continue
+                row["client_id"] = by_number[client_number]
+            try:
+                loan = LoanCreate.model_validate(row)
+            except ValidationError as e:
+                errors.append((line_number, [
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                ]))
+                continue
+            if not resolved and loan.client_id not in known_ids:
+                errors.append((line_number, [f"client_id: unknown client {loan.client_id}"]))
+                continue
+            valid.append((line_number, loan))
+        return valid, errors
+
+    def _insert(self, valid: List[Tuple[int, LoanCreate]]):
+        """
+        Prêts et alertes de validité initiales (comme create_loan, avec leurs lignes
+        d'outbox) en deux INSERT multi-lignes; un seul bloc de numéros pour le paquet
+        """
+        loans = [loan for _, loan in valid]
+        numbers = self.numbers.next_numbers([loan.loan_type for loan in loans], self.agency_code)
+        now = datetime.now()
+
+        rows = []
+        for loan, loan_number in zip(loans, numbers):
+            rows.append({
+                **loan.model_dump(),
+                "loan_number": loan_number,
+                "monthly_payment": amortization.monthly_payment(
+                    loan.amount, loan.interest_rate, loan.duration_months
+                ),
+                "validity_end_date": now + timedelta(days=LOAN_TYPE_POLICIES[loan.loan_type].validity_days),
+            })
+
+        inserted = self.db.execute(
+            insert(Loan).returning(Loan.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        # Same transaction as the loans: one outbox row per alert for the dispatcher
+        self.db.execute(with_outbox(insert(Alert).values([
+            {
+                "loan_id": loan_id,
+                "alert_type": AlertType.VALIDITY_WARNING,
+                "severity": "ORANGE",
+                "message": (
+                    f"L'offre de prêt {row['loan_number']} expire le "
+                    f"{row['validity_end_date'].strftime('%d/%m/%Y')}"
+                ),
+            }
+            for loan_id, row in zip(inserted, rows)
+        ])))
+
+
+def write_errors(path: str, errors: List[Dict]):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["row", "error"])
+        for error in errors:
+            for message in error["errors"]:
+                writer.writerow([error["row"], message])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Importer des prêts depuis un fichier CSV ou Excel")
+    parser.add_argument("path", help="Fichier .csv ou .xlsx (une colonne par champ de LoanCreate)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Lignes par transaction")
+    parser.add_argument("--agency", default=None, help="Code agence des numéros de prêt")
+    parser.add_argument("--errors", default=None, help="Écrire toutes les erreurs dans ce fichier CSV")
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal
+
+    def show_progress(progress: Dict):
+        print(f"  {progress['processed']} lignes, {progress['imported']} importées, {progress['failed']} en erreur")
+
+    db = SessionLocal()
+    try:
+        importer = LoanImporter(db, args.chunk_size, args.agency, progress=show_progress)
+        report = importer.run(iter_rows(args.path), max_errors=sys.maxsize if args.errors else 20)
+    finally:
+        db.close()
+
+    print(f"Importés: {report['imported']}, en erreur: {report['failed']} ({report['elapsed_seconds']} s)")
+    if args.errors:
+        write_errors(args.errors, report["errors"])
+        print(f"Erreurs: {args.errors}")
+    else:
+        for error in report["errors"]:
+            print(f"  ligne {error['row']}: {'; '.join(error['errors'])}")
+
+
+if __name__ == "__main__":
+    main()
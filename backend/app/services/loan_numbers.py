@@ -0,0 +1,79 @@
+# ============================
+# backend/app/services/loan_numbers.py
+# ============================
+"""
+Attribution des numéros de prêt (YYYY/AGENCY/SEQUENCE/TYPE).
+
+Un compteur par (année, agence) est incrémenté par un seul
+INSERT ... ON CONFLICT DO UPDATE ... RETURNING, dans une transaction courte et
+indépendante de celle du prêt: le verrou de la ligne n'est tenu que le temps de
+l'instruction, les créations concurrentes n'attendent pas le commit des autres
+et n'obtiennent jamais le même numéro. Comme avec une séquence PostgreSQL, un
+prêt dont la création échoue laisse un trou dans la numérotation.
+
+Un import en masse réserve un bloc de numéros en un seul aller-retour.
+"""
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import LoanNumberCounter, LoanType
+
+LOAN_TYPE_CODES = {
+    LoanType.CLASSIC_ACQUIRER: "541",
+    LoanType.CLASSIC_BUILDER: "542",
+    LoanType.RENTAL_ORDINARY: "567",
+    LoanType.YOUNG_LAND: "571",
+}
+DEFAULT_TYPE_CODE = "500"
+SEQUENCE_DIGITS = 7
+
+
+def format_loan_number(year: int, agency_code: str, sequence: int, loan_type) -> str:
+    type_code = LOAN_TYPE_CODES.get(loan_type, DEFAULT_TYPE_CODE)
+    return f"{year}/{agency_code}/{str(sequence).zfill(SEQUENCE_DIGITS)}/{type_code}"
+
+
+class LoanNumberAllocator:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def reserve(self, count: int = 1, agency_code: Optional[str] = None,
+                year: Optional[int] = None) -> range:
+        """
+        Réserver un bloc de count numéros de séquence consécutifs
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        year = year or datetime.now().year
+        agency_code = agency_code or settings.LOAN_AGENCY_CODE
+
+        statement = (
+            insert(LoanNumberCounter)
+            .values(year=year, agency_code=agency_code, last_value=count)
+            .on_conflict_do_update(
+                index_elements=[LoanNumberCounter.year, LoanNumberCounter.agency_code],
+                set_={"last_value": LoanNumberCounter.last_value + count},
+            )
+            .returning(LoanNumberCounter.last_value)
+        )
+        # Own short transaction: the counter row is not locked until the loan commits
+        with self.db.get_bind().begin() as connection:
+            last_value = connection.execute(statement).scalar_one()
+        return range(last_value - count + 1, last_value + 1)
+
+    def next_number(self, loan_type, agency_code: Optional[str] = None) -> str:
+        return self.next_numbers([loan_type], agency_code)[0]
+
+    def next_numbers(self, loan_types: List, agency_code: Optional[str] = None) -> List[str]:
+        """
+        Numéros de plusieurs prêts (un par type donné) en une seule réservation
+        """
+        year = datetime.now().year
+        agency_code = agency_code or settings.LOAN_AGENCY_CODE
+        sequences = self.reserve(len(loan_types), agency_code, year)
+        return [
+            format_loan_number(year, agency_code, sequence, loan_type)
+            for sequence, loan_type in zip(sequences, loan_types)
+        ]
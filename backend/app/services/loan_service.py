@@ -1,11 +1,21 @@
 # backend/app/services/loan_service.py
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from decimal import Decimal
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from app.models import Loan, Alert, AlertType, AlertStatus
+from app.models.alert import OPEN_ALERT_CONFLICT
+from app.services.alert_escalation import AlertEscalationScheduler
+from app.services.alert_writer import AlertWriter
 from app.models.loan import LoanStatus, LoanType
+from app.services import amortization
+from app.services.alert_rules import LOAN_TYPE_POLICIES
+from app.services.loan_numbers import LoanNumberAllocator
+from app.services.notification_outbox import with_outbox
+from app.services.repayment_schedule import SCHEDULE_FIELDS, RepaymentScheduleService, schedule_start_date
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -14,25 +24,21 @@ class LoanService:
     def __init__(self, db: Session):
         self.db = db
     
-    def create_loan(self, loan_data: Dict) -> Loan:
+    def create_loan(self, loan_data: Dict, agency_code: Optional[str] = None) -> Loan:
         """
         Créer un nouveau prêt avec calcul automatique de la mensualité
+        (numéro attribué dans l'agence agency_code, LOAN_AGENCY_CODE par défaut)
         """
         # Calculate monthly payment
-        amount = Decimal(str(loan_data['amount']))
-        rate = Decimal(str(loan_data['interest_rate'])) / 100 / 12
-        duration = loan_data['duration_months']
-        
-        if rate > 0:
-            monthly_payment = amount * (rate * (1 + rate) ** duration) / ((1 + rate) ** duration - 1)
-        else:
-            monthly_payment = amount / duration
+        monthly_payment = amortization.monthly_payment(
+            loan_data['amount'], loan_data['interest_rate'], loan_data['duration_months']
+        )
         
         # Generate loan number
-        loan_number = self._generate_loan_number(loan_data['loan_type'])
+        loan_number = self._generate_loan_number(loan_data['loan_type'], agency_code)
         
         # Calculate validity end date based on loan type
-        validity_days = 60 if 'CLASSIQUE' in loan_data['loan_type'] else 90
+        validity_days = LOAN_TYPE_POLICIES[LoanType(loan_data['loan_type'])].validity_days
         validity_end_date = datetime.now() + timedelta(days=validity_days)
         
         # Create loan
@@ -44,56 +50,113 @@ class LoanService:
         )
         
         self.db.add(loan)
-        self.db.commit()
-        self.db.refresh(loan)
+        self.db.flush()
         
-        # Create initial alert for validity tracking
+        # Create initial alert for validity tracking (committed with the loan)
         self._create_validity_alert(loan)
+        self.db.refresh(loan)
         
         return loan
     
-    def _generate_loan_number(self, loan_type: str) -> str:
+    def update_loan(self, loan: Loan, update_data: Dict) -> Loan:
         """
-        Générer un numéro de prêt unique
-        Format: YYYY/AGENCY/SEQUENCE/TYPE
+        Mettre à jour un prêt; la mensualité suit le montant, le taux et la durée,
+        et l'échéancier de ce seul prêt est réécrit quand une de ses données change
         """
-        year = datetime.now().year
-        agency_code = "102"  # TODO: Get from current user's agency
+        changed = {
+            field for field, value in update_data.items()
+            if getattr(loan, field) != value
+        }
+        for field, value in update_data.items():
+            setattr(loan, field, value)
         
-        # Get next sequence number
-        last_loan = self.db.query(Loan).filter(
-            Loan.loan_number.like(f"{year}/{agency_code}/%")
-        ).order_by(Loan.id.desc()).first()
+        if changed & {'amount', 'interest_rate', 'duration_months'}:
+            loan.monthly_payment = amortization.monthly_payment(
+                loan.amount, loan.interest_rate, loan.duration_months
+            )
+        if changed & set(SCHEDULE_FIELDS):
+            # Same transaction as the loan update
+            RepaymentScheduleService(self.db).rebuild(loan)
         
-        if last_loan:
-            last_sequence = int(last_loan.loan_number.split('/')[2])
-            sequence = str(last_sequence + 1).zfill(7)
-        else:
-            sequence = "0000001"
+        self.db.commit()
+        self.db.refresh(loan)
+        return loan
+    
+    def simulate_loans(self, scenarios: List[Dict]) -> Dict:
+        """
+        Chiffrer des scénarios de prêt (montant, taux, durée, différé, type) sans
+        rien écrire: mensualité (formule de create_loan, au centime), coût total
+        (celui de l'échéancier exact) et fin de validité
+        """
+        start = time.perf_counter()
+        priced = amortization.price_loans(
+            [scenario['amount'] for scenario in scenarios],
+            [scenario['interest_rate'] for scenario in scenarios],
+            [scenario['duration_months'] for scenario in scenarios],
+            [scenario.get('grace_period_months') or 0 for scenario in scenarios]
+        )
         
-        # Get type code
-        type_codes = {
-            LoanType.CLASSIC_ACQUIRER: "541",
-            LoanType.CLASSIC_BUILDER: "542",
-            LoanType.RENTAL_ORDINARY: "567",
-            LoanType.YOUNG_LAND: "571"
+        now = datetime.now()
+        validity_end_dates = {
+            loan_type: now + timedelta(days=policy.validity_days)
+            for loan_type, policy in LOAN_TYPE_POLICIES.items()
         }
-        type_code = type_codes.get(loan_type, "500")
-        
-        return f"{year}/{agency_code}/{sequence}/{type_code}"
+        columns = {name: values.tolist() for name, values in priced.items()}
+        results = [
+            {
+                "monthly_payment": columns["monthly_payment"][index],
+                "total_paid": columns["total_paid"][index],
+                "total_interest": columns["total_interest"][index],
+                "validity_end_date": validity_end_dates[LoanType(scenario['loan_type'])],
+            }
+            for index, scenario in enumerate(scenarios)
+        ]
+        return {"results": results, "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)}
+    
+    def get_repayment_schedule(self, loan: Loan, exact: bool = False) -> Dict:
+        """
+        Tableau d'amortissement d'un prêt: aperçu NumPy, ou montants exacts en Decimal
+        """
+        # Exact amounts of a signed loan come from its persisted schedule
+        lines = RepaymentScheduleService(self.db).get_lines(loan.id) if exact else []
+        if not lines:
+            build = amortization.exact_schedule if exact else amortization.preview_lines
+            lines = build(
+                loan.amount,
+                loan.interest_rate,
+                loan.duration_months,
+                loan.grace_period_months or 0,
+                schedule_start_date(loan)
+            )
+        return {
+            "loan_id": loan.id,
+            "loan_number": loan.loan_number,
+            "monthly_payment": loan.monthly_payment,
+            "exact": exact,
+            **amortization.schedule_totals(lines),
+            "lines": lines,
+        }
+    
+    def _generate_loan_number(self, loan_type: str, agency_code: Optional[str] = None) -> str:
+        """
+        Générer un numéro de prêt unique
+        Format: YYYY/AGENCY/SEQUENCE/TYPE (agence: settings.LOAN_AGENCY_CODE par défaut)
+        """
+        return LoanNumberAllocator(self.db).next_number(loan_type, agency_code)
     
     def _create_validity_alert(self, loan: Loan):
         """
-        Créer une alerte pour suivre la validité de l'offre
+        Créer une alerte pour suivre la validité de l'offre, avec sa ligne d'outbox,
+        et valider la transaction en cours
         """
-        alert = Alert(
-            loan_id=loan.id,
-            alert_type=AlertType.VALIDITY_WARNING,
-            severity="ORANGE",
-            message=f"L'offre de prêt {loan.loan_number} expire le {loan.validity_end_date.strftime('%d/%m/%Y')}"
+        writer = AlertWriter(self.db)
+        writer.add(
+            loan.id,
+            AlertType.VALIDITY_WARNING,
+            "ORANGE",
+            f"L'offre de prêt {loan.loan_number} expire le {loan.validity_end_date.strftime('%d/%m/%Y')}"
         )
-        self.db.add(alert)
-        self.db.commit()
+        writer.flush()
     
     def check_loan_validity(self, loan_id: int) -> Dict:
         """
@@ -104,10 +167,10 @@ class LoanService:
             return {"error": "Loan not found"}
         
         days_remaining = (loan.validity_end_date - datetime.now()).days
-        validity_days = 60 if 'CLASSIQUE' in loan.loan_type else 90
+        policy = LOAN_TYPE_POLICIES[loan.loan_type]
         
-        # Check for orange alert (2/3 of time elapsed)
-        if days_remaining <= validity_days / 3 and days_remaining > 5:
+        # Check for orange alert (same thresholds as the alert scan)
+        if days_remaining <= policy.validity_orange_days and days_remaining > policy.validity_red_days:
             self._create_or_update_alert(
                 loan, 
                 AlertType.VALIDITY_WARNING,
@@ -115,8 +178,8 @@ class LoanService:
                 f"Attention: Il reste {days_remaining} jours avant l'expiration de l'offre"
             )
         
-        # Check for red alert (5 days remaining)
-        elif days_remaining <= 5 and days_remaining > 0:
+        # Check for red alert
+        elif days_remaining <= policy.validity_red_days and days_remaining > 0:
             self._create_or_update_alert(
                 loan,
                 AlertType.VALIDITY_CRITICAL,
@@ -138,25 +201,31 @@ class LoanService:
     
     def _create_or_update_alert(self, loan: Loan, alert_type: AlertType, severity: str, message: str):
         """
-        Créer ou mettre à jour une alerte
+        Créer une alerte (avec sa ligne d'outbox) ou mettre à jour l'alerte ouverte
+        du même type (index des alertes ouvertes)
         """
-        existing_alert = self.db.query(Alert).filter(
-            Alert.loan_id == loan.id,
-            Alert.alert_type == alert_type,
-            Alert.status != AlertStatus.RESOLVED
-        ).first()
-        
-        if existing_alert:
-            existing_alert.message = message
-            existing_alert.severity = severity
-        else:
-            alert = Alert(
-                loan_id=loan.id,
-                alert_type=alert_type,
-                severity=severity,
-                message=message
+        created = self.db.scalars(with_outbox(
+            insert(Alert)
+            .values(loan_id=loan.id, alert_type=alert_type, severity=severity, message=message)
+            .on_conflict_do_nothing(**OPEN_ALERT_CONFLICT)
+        )).first()
+        if created is not None:
+            # Notified by the outbox dispatcher, which also starts its escalation clock
+            self.db.commit()
+            return
+        
+        alert = self.db.execute(
+            update(Alert)
+            .where(
+                Alert.loan_id == loan.id,
+                Alert.alert_type == alert_type,
+                Alert.status != AlertStatus.RESOLVED
             )
-            self.db.add(alert)
-        
+            .values(message=message, severity=severity)
+            .returning(Alert.id, Alert.severity)
+            .execution_options(synchronize_session=False)
+        ).first()
         self.db.commit()
-
+        if alert is not None:
+            # A severity change may only bring the escalation deadline forward
+            AlertEscalationScheduler().schedule([alert], keep_earliest=True)
@@ -0,0 +1,52 @@
+# ============================
+# backend/app/services/notification_dedup.py
+# ============================
+"""
+Déduplication des envois de notification.
+
+Chaque envoi (canal, alerte) réserve d'abord une clé Redis (SET NX avec TTL):
+une tâche rejouée (retry Celery, redélivrance acks_late, double .delay()) ne
+renvoie pas un message déjà parti. La clé est libérée si l'envoi échoue, pour
+que la relance des canaux en échec puisse le renvoyer.
+"""
+from typing import Iterable, List, Set, Union
+import logging
+from app.config import settings
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+DEDUP_KEY_PREFIX = "notification:sent:"
+
+
+def dedup_key(channel: str, alert_id: Union[int, str]) -> str:
+    return f"{DEDUP_KEY_PREFIX}{channel}:{alert_id}"
+
+
+class NotificationDeduplicator:
+    def __init__(self, redis_client=None):
+        self.redis = redis_client or get_redis()
+
+    def claim(self, channel: str, alert_ids: List[Union[int, str]]) -> Set[Union[int, str]]:
+        """
+        Réserver les envois d'un canal (un aller-retour Redis); renvoie les alertes
+        réservées, les autres ont déjà été envoyées ou sont en cours d'envoi
+        """
+        if not alert_ids:
+            return set()
+        pipe = self.redis.pipeline(transaction=False)
+        for alert_id in alert_ids:
+            pipe.set(dedup_key(channel, alert_id), 1, nx=True, ex=settings.NOTIFICATION_DEDUP_TTL_SECONDS)
+        claimed = {alert_id for alert_id, ok in zip(alert_ids, pipe.execute()) if ok}
+
+        if len(claimed) < len(alert_ids):
+            logger.info(f"{channel}: {len(alert_ids) - len(claimed)} duplicate notifications skipped")
+        return claimed
+
+    def release(self, channel: str, alert_ids: Iterable[Union[int, str]]):
+        """
+        Libérer les envois en échec
+        """
+        keys = [dedup_key(channel, alert_id) for alert_id in alert_ids]
+        if keys:
+            self.redis.delete(*keys)
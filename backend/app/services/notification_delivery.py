@@ -0,0 +1,140 @@
+# ============================
+# backend/app/services/notification_delivery.py
+# ============================
+"""
+État de livraison des notifications (Alert.email_sent / Alert.sms_sent): True
+envoyé, False en attente ou en échec, NULL rien à envoyer sur ce canal.
+
+Les résultats d'un paquet sont écrits par un seul UPDATE ... FROM (VALUES ...)
+et un commit. Les mêmes indicateurs servent à la relance: seuls les canaux en
+échec d'une alerte récente sont renvoyés.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+from datetime import timedelta
+import logging
+from sqlalchemy import Boolean, Integer, case, cast, column, exists, func, or_, select, update, values
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Alert, AlertStatus, NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+# Channels whose delivery is recorded on the alert
+DELIVERY_FLAGS = {
+    "email": Alert.email_sent,
+    "sms": Alert.sms_sent,
+}
+
+
+class NotificationDeliveryService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, channel: str, results: Iterable[Tuple[int, bool]]):
+        """
+        Enregistrer les résultats (alert_id, envoyé) d'un canal
+        """
+        self.record_many({alert_id: {channel: ok} for alert_id, ok in results})
+
+    def record_many(self, deliveries: Dict[int, Dict[str, Optional[bool]]]):
+        """
+        Enregistrer les résultats de plusieurs canaux en une requête, puis valider
+        """
+        try:
+            self.write(deliveries)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def write(self, deliveries: Dict[int, Dict[str, Optional[bool]]]):
+        """
+        UPDATE ... FROM (VALUES ...) dans la transaction en cours. Par canal:
+        True envoyé, False en échec, None rien à envoyer (pas d'adresse, canal
+        désactivé); un canal absent garde sa valeur
+        """
+        if not deliveries:
+            return
+        states = values(
+            column("alert_id", Integer),
+            *(column(f"{channel}_{field}", Boolean) for channel in DELIVERY_FLAGS for field in ("set", "sent")),
+            name="delivery",
+        ).data([
+            (alert_id, *(
+                value
+                for channel in DELIVERY_FLAGS
+                for value in (channel in channels, channels.get(channel))
+            ))
+            for alert_id, channels in deliveries.items()
+        ])
+        self.db.execute(
+            update(Alert)
+            .where(Alert.id == states.c.alert_id)
+            .values({
+                flag: case(
+                    (states.c[f"{channel}_set"], cast(states.c[f"{channel}_sent"], Boolean)),
+                    else_=flag
+                )
+                for channel, flag in DELIVERY_FLAGS.items()
+            })
+            .execution_options(synchronize_session=False)
+        )
+
+    def failed_alerts(self, limit: int = None) -> Dict[int, Dict[str, bool]]:
+        """
+        Alertes ouvertes déjà notifiées dont un canal a échoué, assez anciennes
+        pour que le premier envoi soit terminé et assez récentes pour être relancées
+        """
+        now = func.now()
+        rows = self.db.execute(
+            select(Alert.id, Alert.email_sent, Alert.sms_sent)
+            .where(
+                Alert.status != AlertStatus.RESOLVED,
+                Alert.triggered_at <= now - timedelta(minutes=settings.NOTIFICATION_RETRY_MIN_AGE_MINUTES),
+                Alert.triggered_at >= now - timedelta(hours=settings.NOTIFICATION_RETRY_MAX_AGE_HOURS),
+                or_(*(flag.is_(False) for flag in DELIVERY_FLAGS.values())),
+                exists().where(
+                    NotificationOutbox.alert_id == Alert.id,
+                    NotificationOutbox.dispatched_at.isnot(None)
+                )
+            )
+            .order_by(Alert.id)
+            .limit(limit or settings.NOTIFICATION_RETRY_BATCH_SIZE)
+        ).all()
+        return {row.id: {"email": row.email_sent, "sms": row.sms_sent} for row in rows}
+
+    def retry_failed(self, limit: int = None) -> Dict[str, int]:
+        """
+        Renvoyer uniquement les canaux en échec (sans nouveau récapitulatif admin
+        ni notification push, qui n'a pas d'indicateur de livraison)
+        """
+        # Import here to avoid circular imports
+        from app.services.notification_outbox import fan_out_notifications
+        from app.services.notification_service import NotificationService
+
+        delivered = self.failed_alerts(limit)
+        if not delivered:
+            return {"alerts": 0, "email": 0, "sms": 0}
+
+        notifications = NotificationService(self.db).build_alert_notifications(
+            list(delivered), queue_digest=False
+        )
+
+        retries = {}
+        for alert_id, notification in notifications.items():
+            if notification.get("error"):
+                continue
+            retry = {"severity": notification["severity"]}
+            for channel in DELIVERY_FLAGS:
+                if notification.get(channel) and delivered[alert_id][channel] is False:
+                    retry[channel] = notification[channel]
+            if len(retry) > 1:
+                retries[alert_id] = retry
+
+        fan_out_notifications(retries)
+        totals = {
+            "alerts": len(retries),
+            **{channel: sum(1 for retry in retries.values() if channel in retry) for channel in DELIVERY_FLAGS},
+        }
+        logger.info(f"🔁 Notification retries: {totals}")
+        return totals
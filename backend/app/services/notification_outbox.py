@@ -0,0 +1,170 @@
+# ============================
+# backend/app/services/notification_outbox.py
+# ============================
+"""
+Outbox transactionnelle des notifications.
+
+Les alertes et leurs lignes d'outbox sont écrites par la même requête (CTE), donc
+dans la même transaction: le scan n'attend jamais le broker et aucune notification
+n'est perdue si le processus s'arrête après le commit. Le dispatcher réserve les
+lignes par lots avec FOR UPDATE SKIP LOCKED, ce qui permet d'en exécuter plusieurs
+en parallèle.
+"""
+from typing import Dict, List
+from datetime import timedelta
+import logging
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Alert, NotificationOutbox, OutboxEvent
+from app.services.alert_escalation import AlertEscalationScheduler
+from app.services.notification_delivery import DELIVERY_FLAGS, NotificationDeliveryService
+
+logger = logging.getLogger(__name__)
+
+
+def with_outbox(alert_statement, event: OutboxEvent = OutboxEvent.ALERT_CREATED):
+    """
+    Envelopper un INSERT/UPDATE d'alertes pour ajouter une ligne d'outbox par alerte
+    touchée, dans la même requête; renvoie les ids des alertes
+    """
+    alerts = alert_statement.returning(Alert.id).cte("outbox_alerts")
+    return insert(NotificationOutbox).from_select(
+        ["alert_id", "event"],
+        select(alerts.c.id, literal(event, NotificationOutbox.event.type))
+    ).returning(NotificationOutbox.alert_id)
+
+
+def fan_out_notifications(notifications: Dict[int, Dict]):
+    """
+    Une tâche par canal et par paquet, sur la file du canal, avec la priorité
+    de la sévérité de l'alerte (les alertes RED passent avant les ORANGE)
+    """
+    # Import here to avoid circular imports
+    from app.tasks import CHANNEL_TASKS
+
+    batch_size = settings.NOTIFICATION_CHANNEL_BATCH_SIZE
+    for channel, task in CHANNEL_TASKS.items():
+        by_priority: Dict[int, List[list]] = {}
+        for alert_id, notification in notifications.items():
+            if notification.get(channel):
+                priority = settings.NOTIFICATION_PRIORITIES.get(notification["severity"], 5)
+                by_priority.setdefault(priority, []).append([alert_id, *notification[channel]])
+
+        for priority, items in sorted(by_priority.items()):
+            for start in range(0, len(items), batch_size):
+                task.apply_async(args=[items[start:start + batch_size]], priority=priority)
+
+
+class NotificationOutboxDispatcher:
+    def __init__(self, db: Session):
+        self.db = db
+        self.escalations = AlertEscalationScheduler()
+
+    def dispatch(self, batch_size: int = None, max_batches: int = None) -> Dict[str, int]:
+        """
+        Vider l'outbox par lots jusqu'à ce qu'il n'y ait plus de ligne disponible
+        """
+        batch_size = batch_size or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+        max_batches = max_batches or settings.NOTIFICATION_OUTBOX_MAX_BATCHES
+        totals = {"dispatched": 0, "failed": 0}
+
+        for _ in range(max_batches):
+            dispatched, failed = self._dispatch_batch(batch_size)
+            totals["dispatched"] += dispatched
+            totals["failed"] += failed
+            if dispatched + failed < batch_size:
+                break
+
+        if totals["dispatched"] or totals["failed"]:
+            logger.info(f"📤 Notification outbox: {totals}")
+        return totals
+
+    def _dispatch_batch(self, batch_size: int):
+        """
+        Réserver un lot (les lignes verrouillées par un autre dispatcher sont sautées),
+        publier les notifications sur les files des canaux puis marquer le lot
+        dans la même transaction
+        """
+        # Import here to avoid circular imports
+        from app.services.notification_service import NotificationService
+
+        try:
+            rows = self.db.execute(
+                select(
+                    NotificationOutbox.id,
+                    NotificationOutbox.alert_id,
+                    NotificationOutbox.event,
+                    NotificationOutbox.attempts,
+                    Alert.severity
+                )
+                .join(Alert, Alert.id == NotificationOutbox.alert_id)
+                .where(
+                    NotificationOutbox.dispatched_at.is_(None),
+                    NotificationOutbox.available_at <= func.now()
+                )
+                .order_by(NotificationOutbox.available_at, NotificationOutbox.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True, of=NotificationOutbox)
+            ).all()
+            if not rows:
+                self.db.commit()
+                return 0, 0
+
+            results = NotificationService(self.db).build_alert_notifications(
+                list({row.alert_id for row in rows})
+            )
+            # Publishing failures raise: the batch is rolled back and claimed again later
+            fan_out_notifications(results)
+            sent = [row for row in rows if not results[row.alert_id].get("error")]
+            failed = [row for row in rows if results[row.alert_id].get("error")]
+
+            # Channels with nothing to send are not retried
+            NotificationDeliveryService(self.db).write({
+                alert_id: {channel: None for channel in DELIVERY_FLAGS if not notification.get(channel)}
+                for alert_id, notification in results.items()
+                if not notification.get("error")
+                and any(not notification.get(channel) for channel in DELIVERY_FLAGS)
+            })
+
+            if sent:
+                self.db.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_([row.id for row in sent]))
+                    .values(dispatched_at=func.now(), attempts=NotificationOutbox.attempts + 1)
+                    .execution_options(synchronize_session=False)
+                )
+            for row in failed:
+                self._retry_later(row, results[row.alert_id].get("message"))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        # The escalation clock of new alerts starts once they have been notified
+        self.escalations.schedule(
+            (row.alert_id, row.severity) for row in sent if row.event == OutboxEvent.ALERT_CREATED
+        )
+        return len(sent), len(failed)
+
+    def _retry_later(self, row, error: str):
+        """
+        Repousser une ligne en échec (attente exponentielle, au plus une heure),
+        abandonnée après NOTIFICATION_OUTBOX_MAX_ATTEMPTS tentatives
+        """
+        attempts = row.attempts + 1
+        values = {"attempts": attempts, "last_error": error}
+        if attempts >= settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+            # Give up: the row leaves the pending index but keeps its error
+            values["dispatched_at"] = func.now()
+            logger.error(f"Notification outbox row {row.id} (alert {row.alert_id}) abandoned: {error}")
+        else:
+            values["available_at"] = func.now() + timedelta(minutes=min(2 ** attempts, 60))
+
+        self.db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == row.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
@@ -0,0 +1,196 @@
+# ============================
+# backend/app/services/notification_preferences.py
+# ============================
+"""
+Préférences de notification des clients, avec cache de lecture à deux niveaux.
+
+Lecture: cache LRU du processus (TTL court), puis hash Redis partagé par les
+workers, puis une seule requête en base pour tous les clients manquants. Une
+mise à jour écrit la base puis remplace le hash Redis et invalide le cache
+local; les autres processus voient la modification au plus tard après
+NOTIFICATION_PREFERENCES_LOCAL_TTL_SECONDS.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable
+import logging
+import threading
+import time
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.redis_client import get_redis
+from app.models import NotificationPreference
+
+logger = logging.getLogger(__name__)
+
+PREFERENCE_CHANNELS = ("email", "sms", "push")
+PREFERENCES_KEY_PREFIX = "notification:preferences:"
+
+
+class TTLCache:
+    """
+    Petit cache LRU en mémoire dont les entrées expirent après ttl secondes
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local_cache = TTLCache(
+    settings.NOTIFICATION_PREFERENCES_CACHE_SIZE,
+    settings.NOTIFICATION_PREFERENCES_LOCAL_TTL_SECONDS,
+)
+
+
+def default_preferences() -> Dict[str, bool]:
+    return dict(settings.NOTIFICATION_DEFAULT_PREFERENCES)
+
+
+class NotificationPreferenceService:
+    def __init__(self, db: Session, redis_client=None):
+        self.db = db
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def get(self, client_id: int) -> Dict[str, bool]:
+        return self.get_many([client_id])[client_id]
+
+    def get_many(self, client_ids: Iterable[int]) -> Dict[int, Dict[str, bool]]:
+        """
+        Préférences de plusieurs clients: au plus un aller-retour Redis et une requête SQL
+        """
+        preferences: Dict[int, Dict[str, bool]] = {}
+        missing = []
+        for client_id in set(client_ids):
+            cached = _local_cache.get(client_id)
+            if cached is None:
+                missing.append(client_id)
+            else:
+                preferences[client_id] = cached
+        if not missing:
+            return preferences
+
+        missing = self._read_redis(missing, preferences)
+        if missing:
+            loaded = self._load(missing)
+            self._write_redis(loaded)
+            preferences.update(loaded)
+
+        for client_id in missing:
+            _local_cache.set(client_id, preferences[client_id])
+        return preferences
+
+    def update(self, client_id: int, changes: Dict[str, bool]) -> Dict[str, bool]:
+        """
+        Modifier les canaux d'un client (les canaux absents gardent leur valeur)
+        """
+        unknown = set(changes) - set(PREFERENCE_CHANNELS)
+        if unknown:
+            raise ValueError(f"Unknown notification channels: {sorted(unknown)}")
+
+        values = {**self._load([client_id])[client_id], **changes}
+        self.db.execute(
+            insert(NotificationPreference)
+            .values(client_id=client_id, **values)
+            .on_conflict_do_update(index_elements=[NotificationPreference.client_id], set_=values)
+        )
+        self.db.commit()
+
+        _local_cache.pop(client_id)
+        try:
+            key = PREFERENCES_KEY_PREFIX + str(client_id)
+            pipe = self.redis.pipeline()
+            pipe.hset(key, mapping={channel: int(enabled) for channel, enabled in values.items()})
+            pipe.expire(key, settings.NOTIFICATION_PREFERENCES_REDIS_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            # The database is up to date; a stale Redis entry expires with its TTL
+            logger.error(f"Failed to refresh cached notification preferences of client {client_id}: {str(e)}")
+        return values
+
+    def _load(self, client_ids: list) -> Dict[int, Dict[str, bool]]:
+        rows = self.db.execute(
+            select(
+                NotificationPreference.client_id,
+                NotificationPreference.email,
+                NotificationPreference.sms,
+                NotificationPreference.push
+            ).where(NotificationPreference.client_id.in_(client_ids))
+        ).all()
+        preferences = {client_id: default_preferences() for client_id in client_ids}
+        for row in rows:
+            preferences[row.client_id] = {channel: getattr(row, channel) for channel in PREFERENCE_CHANNELS}
+        return preferences
+
+    def _read_redis(self, client_ids: list, preferences: Dict[int, Dict[str, bool]]) -> list:
+        """
+        Compléter preferences depuis Redis; renvoie les clients absents du cache
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for client_id in client_ids:
+                pipe.hgetall(PREFERENCES_KEY_PREFIX + str(client_id))
+            cached = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Notification preferences cache unavailable: {str(e)}")
+            return client_ids
+
+        missing = []
+        for client_id, values in zip(client_ids, cached):
+            if len(values) == len(PREFERENCE_CHANNELS):
+                preferences[client_id] = {channel: values[channel] == "1" for channel in PREFERENCE_CHANNELS}
+            else:
+                missing.append(client_id)
+        return missing
+
+    def _write_redis(self, preferences: Dict[int, Dict[str, bool]]):
+        """
+        Mettre en cache des préférences lues en base; HSETNX ne remplace jamais
+        une valeur écrite entre-temps par update()
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for client_id, values in preferences.items():
+                key = PREFERENCES_KEY_PREFIX + str(client_id)
+                for channel, enabled in values.items():
+                    pipe.hsetnx(key, channel, int(enabled))
+                pipe.expire(key, settings.NOTIFICATION_PREFERENCES_REDIS_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to cache notification preferences: {str(e)}")
@@ -4,11 +4,33 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import logging
-from sqlalchemy.orm import Session
-from app.models import Alert, Loan, Client
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from app.config import settings
+from app.models import Alert, Loan
+from app.services.alert_digest import AlertDigest, digest_item
+from app.services.email_channel import OutgoingEmail, get_email_channel
+from app.services.notification_dedup import NotificationDeduplicator
+from app.services.notification_delivery import NotificationDeliveryService
+from app.services.notification_preferences import NotificationPreferenceService, default_preferences
+from app.services.notification_templates import get_templates
+from app.services.sms_channel import SMSChannel, get_sms_provider
 
 logger = logging.getLogger(__name__)
 
+NOTIFICATION_CHANNELS = ("email", "sms", "push")
+
+
+def channel_items(notifications: Dict[int, Dict[str, Any]], channel: str) -> List[list]:
+    """
+    Items [alert_id, *payload] of a channel (JSON-serializable task arguments)
+    """
+    return [
+        [alert_id, *notification[channel]]
+        for alert_id, notification in notifications.items()
+        if notification.get(channel)
+    ]
+
 
 class NotificationService:
     def __init__(self, db: Session):
@@ -18,27 +40,35 @@ class NotificationService:
         """
         Send email notification
         """
+        return self.send_email_notifications([(to_email, subject, message)])[0]
+    
+    def send_email_notifications(self, emails: List[OutgoingEmail]) -> List[bool]:
+        """
+        Send many email notifications concurrently over the worker's SMTP pool
+        Emails are only logged when SMTP_HOST is not configured
+        """
         try:
-            # TODO: Implement actual email sending logic (SMTP, SendGrid, etc.)
-            # For now, just log the notification
-            logger.info(f"📧 Email notification sent to {to_email}")
-            logger.info(f"📧 Subject: {subject}")
-            logger.info(f"📧 Message: {message}")
-            return True
+            channel = get_email_channel()
+            if channel is not None:
+                results = channel.send_many(emails)
+                logger.info(f"📧 {sum(results)}/{len(emails)} email notifications sent")
+                return results
+            
+            for to_email, subject, message in emails:
+                logger.info(f"📧 Email notification sent to {to_email}")
+                logger.info(f"📧 Subject: {subject}")
+                logger.info(f"📧 Message: {message}")
+            return [True] * len(emails)
         except Exception as e:
-            logger.error(f"Failed to send email notification: {str(e)}")
-            return False
+            logger.error(f"Failed to send email notifications: {str(e)}")
+            return [False] * len(emails)
     
     def send_sms_notification(self, phone_number: str, message: str) -> bool:
         """
-        Send SMS notification
+        Send SMS notification immediately (not coalesced)
         """
         try:
-            # TODO: Implement actual SMS sending logic (Twilio, etc.)
-            # For now, just log the notification
-            logger.info(f"📱 SMS notification sent to {phone_number}")
-            logger.info(f"📱 Message: {message}")
-            return True
+            return get_sms_provider().send_bulk([(phone_number, message)])[0]
         except Exception as e:
             logger.error(f"Failed to send SMS notification: {str(e)}")
             return False
@@ -63,168 +93,210 @@ class NotificationService:
         Send notifications for a specific alert (called from tasks.py)
         This is the main method called by the Celery task
         """
+        return self.send_alert_notifications_batch([alert_id]).get(
+            alert_id, {"error": True, "message": "Alert not found"}
+        )
+    
+    def send_alert_notifications_batch(self, alert_ids: List[int]) -> Dict[int, Dict[str, bool]]:
+        """
+        Send notifications for many alerts, all channels in the calling process
+        Alerts, loans and clients are loaded with a single joined query
+        """
+        notifications = self.build_alert_notifications(alert_ids)
+        results = {
+            alert_id: notification if notification.get("error") else {"admin_digest": True}
+            for alert_id, notification in notifications.items()
+        }
+        
+        for channel, send in (("email", self.send_email_batch),
+                              ("sms", self.send_sms_batch),
+                              ("push", self.send_push_batch)):
+            items = channel_items(notifications, channel)
+            for (alert_id, *_), ok in zip(items, send(items)):
+                results[alert_id][channel] = ok
+        
+        for alert_id, result in results.items():
+            if not result.get("error"):
+                logger.info(f"✅ Alert notifications sent for alert {alert_id}: {result}")
+        return results
+    
+    def build_alert_notifications(self, alert_ids: List[int], queue_digest: bool = True) -> Dict[int, Dict[str, Any]]:
+        """
+        Load alerts, loans and clients with a single joined query and render the
+        message of each channel enabled by the client; admin notifications go to
+        the agency digest
+        """
         try:
-            # Get alert details from database
-            alert = self.db.query(Alert).filter(Alert.id == alert_id).first()
-            if not alert:
-                logger.error(f"Alert {alert_id} not found")
-                return {"error": True, "message": "Alert not found"}
-            
-            # Get loan and client information
-            loan = self.db.query(Loan).filter(Loan.id == alert.loan_id).first()
+            alerts = self.db.scalars(
+                select(Alert)
+                .options(joinedload(Alert.loan).joinedload(Loan.client))
+                .where(Alert.id.in_(alert_ids))
+            ).all()
+        except Exception as e:
+            logger.error(f"Failed to load alerts {alert_ids}: {str(e)}")
+            return {alert_id: {"error": True, "message": str(e)} for alert_id in alert_ids}
+        
+        preferences = self._client_preferences({alert.loan.client_id for alert in alerts if alert.loan})
+        digest_items = []
+        notifications = {
+            alert.id: self._build_alert_notifications(alert, digest_items, preferences)
+            for alert in alerts
+        }
+        for alert_id in set(alert_ids) - notifications.keys():
+            logger.error(f"Alert {alert_id} not found")
+            notifications[alert_id] = {"error": True, "message": "Alert not found"}
+        
+        if queue_digest:
+            self._queue_admin_digest(digest_items)
+        return notifications
+    
+    def send_email_batch(self, items: List[list]) -> List[bool]:
+        """
+        Send [alert_id, to_email, subject, message] items concurrently, at most once
+        per alert, and record their delivery state with one bulk update
+        """
+        return self._send_once("email", items, self._send_and_record_emails)
+    
+    def send_sms_batch(self, items: List[list]) -> List[bool]:
+        """
+        Queue [alert_id, phone_number, message, line, severity] items, at most once
+        per alert; alerts for the same phone number are coalesced into one SMS by
+        the flush_sms task
+        """
+        return self._send_once("sms", items, self._queue_sms)
+    
+    def send_push_batch(self, items: List[list]) -> List[bool]:
+        """
+        Send [alert_id, user_id, title, message] items, at most once per alert
+        """
+        return self._send_once("push", items, lambda items: [
+            self.send_push_notification(user_id, title, message) for _, user_id, title, message in items
+        ])
+    
+    def _send_once(self, channel: str, items: List[list], send) -> List[bool]:
+        """
+        Skip the items already claimed by an earlier attempt (reported as sent) and
+        release the failed ones so that they can be retried
+        """
+        deduplicator = NotificationDeduplicator()
+        claimed = deduplicator.claim(channel, [item[0] for item in items])
+        pending = [item for item in items if item[0] in claimed]
+        sent = dict(zip((item[0] for item in pending), send(pending))) if pending else {}
+        deduplicator.release(channel, [alert_id for alert_id, ok in sent.items() if not ok])
+        return [sent.get(item[0], True) for item in items]
+    
+    def _send_and_record_emails(self, items: List[list]) -> List[bool]:
+        results = self.send_email_notifications([tuple(item[1:]) for item in items])
+        try:
+            NotificationDeliveryService(self.db).record("email", zip((item[0] for item in items), results))
+        except Exception as e:
+            logger.error(f"Failed to record email delivery states: {str(e)}")
+        return results
+    
+    def _queue_sms(self, items: List[list]) -> List[bool]:
+        try:
+            SMSChannel().enqueue(items)
+            return [True] * len(items)
+        except Exception as e:
+            logger.error(f"Failed to queue SMS notifications: {str(e)}")
+            return [False] * len(items)
+    
+    def _queue_admin_digest(self, digest_items: List[Dict]):
+        """
+        Buffer admin notifications; they are sent as one digest per agency
+        """
+        if not digest_items:
+            return
+        try:
+            full_agencies = AlertDigest(self.db).add(digest_items)
+            if full_agencies:
+                # Import here to avoid circular imports
+                from app.tasks import flush_alert_digest
+                flush_alert_digest.delay(full_agencies)
+        except Exception as e:
+            logger.error(f"Failed to queue admin digest items: {str(e)}")
+    
+    def _client_preferences(self, client_ids) -> Dict[int, Dict[str, bool]]:
+        """
+        Cached preferences of many clients (defaults if they cannot be loaded)
+        """
+        try:
+            return NotificationPreferenceService(self.db).get_many(client_ids)
+        except Exception as e:
+            logger.error(f"Failed to load notification preferences: {str(e)}")
+            return {client_id: default_preferences() for client_id in client_ids}
+    
+    def _build_alert_notifications(self, alert: Alert, digest_items: List[Dict],
+                                   preferences: Dict[int, Dict[str, bool]]) -> Dict[str, Any]:
+        """
+        Render the notifications of an alert whose loan and client are already loaded
+        """
+        try:
+            loan = alert.loan
             if not loan:
-                logger.error(f"Loan {alert.loan_id} not found for alert {alert_id}")
+                logger.error(f"Loan {alert.loan_id} not found for alert {alert.id}")
                 return {"error": True, "message": "Loan not found"}
             
-            client = self.db.query(Client).filter(Client.id == loan.client_id).first()
+            client = loan.client
             if not client:
                 logger.error(f"Client {loan.client_id} not found for loan {loan.id}")
                 return {"error": True, "message": "Client not found"}
             
-            # Prepare notification content
-            subject = f"🚨 Alerte CFC - {alert.alert_type.value}"
-            message = self._format_alert_message(alert, loan, client)
-            
-            results = {}
+            # Prepare notification content (clients get the default language)
+            templates = get_templates(settings.DEFAULT_LANGUAGE)
+            fields = templates.alert_fields(alert, loan, client)
             
-            # Send email notification
-            if client.email:
-                results['email'] = self.send_email_notification(
-                    to_email=client.email,
-                    subject=subject,
-                    message=message
-                )
+            notification = {"severity": alert.severity}
+            enabled = preferences.get(client.id) or default_preferences()
             
-            # Send SMS notification if phone number available
-            if client.phone:
-                sms_message = self._format_sms_message(alert, loan, client)
-                results['sms'] = self.send_sms_notification(
-                    phone_number=client.phone,
-                    message=sms_message
-                )
+            # Email notification
+            if enabled["email"] and client.email:
+                notification['email'] = [
+                    client.email,
+                    templates.render("email_subject", alert.alert_type, **fields),
+                    templates.render("email", alert.alert_type, **fields)
+                ]
             
-            # Send push notification (if user has app)
-            results['push'] = self.send_push_notification(
-                user_id=client.id,
-                title=f"Alerte - {alert.alert_type.value}",
-                message=alert.message
-            )
+            # SMS notification if phone number available
+            if enabled["sms"] and client.phone:
+                notification['sms'] = [
+                    client.phone,
+                    templates.render("sms", alert.alert_type, **fields),
+                    templates.render("sms_line", alert.alert_type, **fields),
+                    alert.severity
+                ]
             
-            # Also notify admin/managers
-            results['admin_email'] = self.send_email_notification(
-                to_email="admin@cfc-deblocages.com",  # TODO: Configure admin email
-                subject=f"[CFC Admin] {subject}",
-                message=self._format_admin_message(alert, loan, client)
-            )
+            # Push notification (if user has app)
+            if enabled["push"]:
+                notification['push'] = [
+                    client.id,
+                    templates.render("push_title", alert.alert_type, **fields),
+                    alert.message
+                ]
             
-            logger.info(f"✅ Alert notifications sent for alert {alert_id}: {results}")
-            return results
+            # Admins/managers get the alert in their agency digest
+            digest_items.append(digest_item(alert, loan, client))
+            return notification
             
         except Exception as e:
-            logger.error(f"Failed to send alert notifications for alert {alert_id}: {str(e)}")
+            logger.error(f"Failed to build alert notifications for alert {alert.id}: {str(e)}")
             return {"error": True, "message": str(e)}
     
-    def _format_alert_message(self, alert: Alert, loan: Loan, client: Client) -> str:
-        """
-        Format alert message for email
-        """
-        return f"""
-Bonjour {client.first_name} {client.last_name},
-
-Une alerte a été générée concernant votre dossier de prêt :
-
-📋 Détails de l'alerte :
-- Type : {alert.alert_type.value}
-- Niveau : {alert.severity}
-- Message : {alert.message}
-- Date : {alert.created_at.strftime('%d/%m/%Y %H:%M')}
-
-📄 Informations du prêt :
-- Numéro de dossier : {loan.id}
-- Type de prêt : {loan.loan_type}
-- Montant : {loan.amount:,.0f} FCFA
-
-ℹ️ Actions recommandées :
-{self._get_recommended_actions(alert)}
-
-Pour plus d'informations, veuillez contacter votre conseiller ou vous connecter à votre espace client.
-
-Cordialement,
-L'équipe CFC Déblocages
-        """.strip()
-    
-    def _format_sms_message(self, alert: Alert, loan: Loan, client: Client) -> str:
-        """
-        Format alert message for SMS (shorter version)
+    def get_notification_preferences(self, client_id: int) -> Dict[str, bool]:
         """
-        severity_emoji = "🔴" if alert.severity == "RED" else "🟠"
-        return f"{severity_emoji} CFC Alert: {alert.message} - Dossier #{loan.id}. Contactez votre conseiller."
-    
-    def _format_admin_message(self, alert: Alert, loan: Loan, client: Client) -> str:
+        Get a client's notification preferences (cached), keyed by Client.id
         """
-        Format alert message for admin notifications
-        """
-        return f"""
-Nouvelle alerte générée dans le système CFC Déblocages :
-
-🚨 Détails de l'alerte :
-- ID : {alert.id}
-- Type : {alert.alert_type.value}
-- Niveau : {alert.severity}
-- Message : {alert.message}
-- Statut : {alert.status.value}
-- Créée le : {alert.created_at.strftime('%d/%m/%Y %H:%M')}
-
-👤 Client concerné :
-- Nom : {client.first_name} {client.last_name}
-- Email : {client.email}
-- Téléphone : {client.phone}
-
-💰 Prêt concerné :
-- ID : {loan.id}
-- Type : {loan.loan_type}
-- Montant : {loan.amount:,.0f} FCFA
-- Statut : {loan.status.value}
-
-Veuillez prendre les mesures appropriées.
-
-Système CFC Déblocages
-        """.strip()
-    
-    def _get_recommended_actions(self, alert: Alert) -> str:
-        """
-        Get recommended actions based on alert type
-        """
-        action_map = {
-            "VALIDITY_WARNING": "• Contactez votre conseiller pour renouveler l'offre\n• Préparez les documents manquants",
-            "VALIDITY_CRITICAL": "• URGENT: Contactez immédiatement votre conseiller\n• L'offre expire très bientôt",
-            "WORK_DELAY_WARNING": "• Vérifiez l'avancement des travaux\n• Contactez votre entrepreneur",
-            "REPAYMENT_UPCOMING": "• Préparez votre premier remboursement\n• Vérifiez votre compte bancaire",
-            "REPAYMENT_IMMINENT": "• URGENT: Premier remboursement dans quelques jours\n• Assurez-vous d'avoir les fonds nécessaires"
-        }
-        
-        return action_map.get(alert.alert_type.value, "• Contactez votre conseiller pour plus d'informations")
-    
-    def get_notification_preferences(self, user_id: int) -> Dict[str, bool]:
-        """
-        Get user notification preferences
-        """
-        # TODO: Implement actual preferences retrieval from database
-        # For now, return default preferences
-        return {
-            "email": True,
-            "sms": False,
-            "push": True
-        }
+        return NotificationPreferenceService(self.db).get(client_id)
     
-    def update_notification_preferences(self, user_id: int, preferences: Dict[str, bool]) -> bool:
+    def update_notification_preferences(self, client_id: int, preferences: Dict[str, bool]) -> bool:
         """
-        Update user notification preferences
+        Update a client's notification preferences (keyed by Client.id) and refresh the caches
         """
         try:
-            # TODO: Implement actual preferences update in database
-            logger.info(f"Updated notification preferences for user {user_id}: {preferences}")
+            values = NotificationPreferenceService(self.db).update(client_id, preferences)
+            logger.info(f"Updated notification preferences for client {client_id}: {values}")
             return True
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Failed to update notification preferences: {str(e)}")
             return False
\ No newline at end of file
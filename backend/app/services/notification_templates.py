@@ -0,0 +1,217 @@
+# ============================
+# backend/app/services/notification_templates.py
+# ============================
+"""
+Modèles de notification localisés et précompilés.
+
+Les textes source (msgid) sont en anglais et traduits par les catalogues Babel
+de app/locales. Chaque modèle est compilé une seule fois par (canal, langue,
+type d'alerte): les parties statiques (libellés, actions recommandées) sont
+déjà insérées et seuls les champs propres à l'alerte restent à interpoler.
+
+Microbenchmark: python -m app.services.notification_templates
+"""
+from functools import lru_cache
+from typing import Dict, Optional
+import logging
+from app.config import settings
+from app.core.i18n import get_translations
+from app.models import Alert, AlertType, Client, Loan
+
+logger = logging.getLogger(__name__)
+
+
+def N_(message: str) -> str:
+    """
+    Marquer un texte à traduire (extraction Babel), traduit à la compilation des modèles
+    """
+    return message
+
+
+TEMPLATES: Dict[str, str] = {
+    "email_subject": N_("🚨 CFC Alert - {alert_type_label}"),
+    "email": N_(
+        "Hello {client_name},\n"
+        "\n"
+        "An alert has been raised on your loan file:\n"
+        "\n"
+        "📋 Alert details:\n"
+        "- Type: {alert_type_label}\n"
+        "- Level: {severity}\n"
+        "- Message: {message}\n"
+        "- Date: {triggered_at}\n"
+        "\n"
+        "📄 Loan information:\n"
+        "- File number: {loan_number}\n"
+        "- Loan type: {loan_type}\n"
+        "- Amount: {amount} FCFA\n"
+        "\n"
+        "ℹ️ Recommended actions:\n"
+        "{recommended_actions}\n"
+        "\n"
+        "For more information, please contact your advisor or log in to your customer area.\n"
+        "\n"
+        "Kind regards,\n"
+        "The CFC Déblocages team"
+    ),
+    "sms": N_("{severity_icon} CFC Alert: {message} - File #{loan_number}. Contact your advisor."),
+    "sms_line": N_("{severity_icon} #{loan_number}: {message}"),
+    "sms_coalesced": N_("CFC: {count} alerts on your files:\n{lines}\nContact your advisor."),
+    "sms_more": N_("(+{more} other alerts)"),
+    "push_title": N_("Alert - {alert_type_label}"),
+    "digest_subject": N_("[CFC Admin] Alert digest - agency {agency} ({count})"),
+    "digest": N_(
+        "Alerts raised for agency {agency}:\n"
+        "\n"
+        "🚨 {count} alerts (🔴 {red} red, 🟠 {orange} orange)\n"
+        "\n"
+        "📊 By type:\n"
+        "{by_type}\n"
+        "\n"
+        "📋 Details:\n"
+        "{lines}\n"
+        "\n"
+        "Please take the appropriate action.\n"
+        "\n"
+        "CFC Déblocages system"
+    ),
+    "digest_line": N_("{severity_icon} #{alert_id} {loan_number} - {client_name} ({client_phone}): {message}"),
+}
+
+ALERT_TYPE_LABELS: Dict[AlertType, str] = {
+    AlertType.VALIDITY_WARNING: N_("Validity warning"),
+    AlertType.VALIDITY_CRITICAL: N_("Offer about to expire"),
+    AlertType.WORK_DELAY_WARNING: N_("Work delay detected"),
+    AlertType.WORK_DELAY_CRITICAL: N_("Critical work delay"),
+    AlertType.REPAYMENT_UPCOMING: N_("Repayment starting soon"),
+    AlertType.REPAYMENT_IMMINENT: N_("Repayment imminent"),
+    AlertType.MISSING_DOCUMENT: N_("Missing document"),
+    AlertType.DOCUMENT_EXPIRY: N_("Document expiring"),
+}
+
+RECOMMENDED_ACTIONS: Dict[AlertType, str] = {
+    AlertType.VALIDITY_WARNING: N_("• Contact your advisor to renew the offer\n• Prepare the missing documents"),
+    AlertType.VALIDITY_CRITICAL: N_("• URGENT: Contact your advisor immediately\n• The offer expires very soon"),
+    AlertType.WORK_DELAY_WARNING: N_("• Check the progress of the work\n• Contact your contractor"),
+    AlertType.REPAYMENT_UPCOMING: N_("• Prepare your first repayment\n• Check your bank account"),
+    AlertType.REPAYMENT_IMMINENT: N_("• URGENT: First repayment in a few days\n• Make sure you have the necessary funds"),
+}
+DEFAULT_ACTIONS = N_("• Contact your advisor for more information")
+
+SEVERITY_ICONS = {"RED": "🔴", "ORANGE": "🟠"}
+DATE_FORMATS = {"fr": "%d/%m/%Y %H:%M", "en": "%Y-%m-%d %H:%M"}
+THOUSANDS_SEPARATORS = {"fr": " ", "en": ","}
+
+
+def _escape(value: str) -> str:
+    """
+    Protéger les accolades d'une valeur statique insérée dans un modèle str.format
+    """
+    return value.replace("{", "{{").replace("}", "}}")
+
+
+class _KeepMissing(dict):
+    """
+    Laisse intacts les champs non statiques lors de la précompilation
+    """
+
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+
+class LocalizedTemplates:
+    """
+    Modèles compilés d'une langue: un str.format par (canal, type d'alerte)
+    """
+
+    def __init__(self, locale: str):
+        self.locale = locale
+        gettext = get_translations(locale).gettext
+        self.date_format = DATE_FORMATS.get(locale, DATE_FORMATS["en"])
+        self.thousands_separator = THOUSANDS_SEPARATORS.get(locale, ",")
+
+        self._compiled: Dict[str, Dict[Optional[AlertType], str]] = {}
+        for channel, source in TEMPLATES.items():
+            translated = gettext(source)
+            by_type = {None: translated.format_map(_KeepMissing())}
+            for alert_type in AlertType:
+                static = _KeepMissing(
+                    alert_type_label=_escape(gettext(ALERT_TYPE_LABELS[alert_type])),
+                    recommended_actions=_escape(gettext(RECOMMENDED_ACTIONS.get(alert_type, DEFAULT_ACTIONS))),
+                )
+                by_type[alert_type] = translated.format_map(static)
+            self._compiled[channel] = by_type
+
+    def render(self, channel: str, alert_type: Optional[AlertType] = None, **fields) -> str:
+        return self._compiled[channel][alert_type].format_map(fields)
+
+    def format_amount(self, amount) -> str:
+        return f"{amount:,.0f}".replace(",", self.thousands_separator)
+
+    def alert_fields(self, alert: Alert, loan: Loan, client: Client) -> Dict[str, str]:
+        """
+        Champs propres à une alerte (les seuls interpolés à chaque envoi)
+        """
+        return {
+            "client_name": client.name,
+            "severity": alert.severity,
+            "severity_icon": SEVERITY_ICONS.get(alert.severity, "🟠"),
+            "message": alert.message,
+            "triggered_at": alert.triggered_at.strftime(self.date_format) if alert.triggered_at else "",
+            "loan_number": loan.loan_number,
+            "loan_type": loan.loan_type.value,
+            "amount": self.format_amount(loan.amount),
+        }
+
+
+@lru_cache(maxsize=None)
+def get_templates(locale: Optional[str] = None) -> LocalizedTemplates:
+    """
+    Modèles compilés d'une langue (langue par défaut si elle n'est pas supportée)
+    """
+    if locale not in settings.SUPPORTED_LANGUAGES:
+        locale = settings.DEFAULT_LANGUAGE
+    return LocalizedTemplates(locale)
+
+
+def compile_templates():
+    """
+    Compiler les modèles de toutes les langues supportées (démarrage du worker)
+    """
+    for locale in settings.SUPPORTED_LANGUAGES:
+        get_templates(locale)
+    logger.info(f"Notification templates compiled for {settings.SUPPORTED_LANGUAGES}")
+
+
+def main():
+    import timeit
+    from datetime import datetime
+    from decimal import Decimal
+    from app.models import LoanType
+
+    alert = Alert(id=1, alert_type=AlertType.VALIDITY_WARNING, severity="ORANGE",
+                  message="Attention: Il reste 12 jours avant l'expiration de l'offre",
+                  triggered_at=datetime.now())
+    loan = Loan(id=1, loan_number="2025/102/000123/01", loan_type=LoanType.CLASSIC_ACQUIRER,
+                amount=Decimal("25000000"))
+    client = Client(id=1, name="Jean Dupont", phone="+237600000000")
+
+    compile_seconds = timeit.timeit(lambda: LocalizedTemplates(settings.DEFAULT_LANGUAGE), number=20) / 20
+    print(f"Compilation: {compile_seconds * 1e3:.2f} ms per locale")
+
+    for locale in settings.SUPPORTED_LANGUAGES:
+        templates = get_templates(locale)
+
+        def render_all():
+            fields = templates.alert_fields(alert, loan, client)
+            templates.render("email_subject", alert.alert_type, **fields)
+            templates.render("email", alert.alert_type, **fields)
+            templates.render("sms", alert.alert_type, **fields)
+
+        number = 20000
+        seconds = timeit.timeit(render_all, number=number) / number
+        print(f"[{locale}] email + subject + sms: {seconds * 1e6:.1f} µs per alert")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# ============================
+# backend/app/services/repayment_schedule.py
+# ============================
+"""
+Échéancier persisté des prêts signés (table repayment_schedule).
+
+L'échéancier exact (Decimal) est écrit à la signature, puis réécrit pour ce seul
+prêt lorsqu'une donnée qui le détermine change. Les échéances à venir et la date
+de fin du différé se lisent alors dans la table au lieu d'être recalculées.
+
+Reconstruction des prêts déjà signés: python -m app.services.repayment_schedule
+"""
+from typing import Dict, List, Optional
+from datetime import date, datetime
+import argparse
+import logging
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.models import Loan, RepaymentSchedule
+from app.services.amortization import exact_schedule
+
+logger = logging.getLogger(__name__)
+
+# Loan fields that determine the schedule
+SCHEDULE_FIELDS = (
+    "amount",
+    "interest_rate",
+    "duration_months",
+    "grace_period_months",
+    "first_payment_date",
+    "signature_date",
+)
+
+
+def schedule_start_date(loan: Loan) -> Optional[datetime]:
+    """
+    Première échéance: first_payment_date, sinon un mois après la signature
+    """
+    if loan.first_payment_date:
+        return loan.first_payment_date
+    if loan.signature_date:
+        return loan.signature_date + relativedelta(months=1)
+    return None
+
+
+def repayment_start_date():
+    """
+    Date de la première échéance d'amortissement (fin du différé) lue dans
+    l'échéancier: une recherche sur l'index unique (loan_id, period)
+    """
+    return (
+        select(RepaymentSchedule.due_date)
+        .where(
+            RepaymentSchedule.loan_id == Loan.id,
+            RepaymentSchedule.period == func.coalesce(Loan.grace_period_months, 0) + 1
+        )
+        .correlate(Loan)
+        .scalar_subquery()
+    )
+
+
+class RepaymentScheduleService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def rebuild(self, loan: Loan) -> int:
+        """
+        Réécrire l'échéancier d'un prêt dans la transaction en cours (vide s'il
+        n'est pas signé); renvoie le nombre d'échéances
+        """
+        self.db.execute(delete(RepaymentSchedule).where(RepaymentSchedule.loan_id == loan.id))
+        if not loan.signature_date:
+            return 0
+
+        lines = exact_schedule(
+            loan.amount,
+            loan.interest_rate,
+            loan.duration_months,
+            loan.grace_period_months or 0,
+            schedule_start_date(loan)
+        )
+        self.db.execute(insert(RepaymentSchedule), [{"loan_id": loan.id, **line} for line in lines])
+        return len(lines)
+
+    def get_lines(self, loan_id: int) -> List[Dict]:
+        rows = self.db.execute(
+            select(
+                RepaymentSchedule.period,
+                RepaymentSchedule.due_date,
+                RepaymentSchedule.payment,
+                RepaymentSchedule.interest,
+                RepaymentSchedule.principal,
+                RepaymentSchedule.balance
+            )
+            .where(RepaymentSchedule.loan_id == loan_id)
+            .order_by(RepaymentSchedule.period)
+        ).all()
+        return [row._asdict() for row in rows]
+
+    def upcoming(self, start: date, end: date, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Échéances entre start et end inclus (parcours de l'index sur due_date)
+        """
+        query = (
+            select(
+                RepaymentSchedule.loan_id,
+                Loan.loan_number,
+                RepaymentSchedule.period,
+                RepaymentSchedule.due_date,
+                RepaymentSchedule.payment
+            )
+            .join(Loan, Loan.id == RepaymentSchedule.loan_id)
+            .where(RepaymentSchedule.due_date.between(start, end))
+            .order_by(RepaymentSchedule.due_date, RepaymentSchedule.loan_id)
+        )
+        if limit:
+            query = query.limit(limit)
+        return [row._asdict() for row in self.db.execute(query).all()]
+
+    def rebuild_all(self, batch_size: int = 500) -> int:
+        """
+        Reconstruire l'échéancier de tous les prêts signés (un commit par lot)
+        """
+        total = 0
+        last_id = 0
+        while True:
+            loans = self.db.scalars(
+                select(Loan)
+                .where(Loan.signature_date.isnot(None), Loan.id > last_id)
+                .order_by(Loan.id)
+                .limit(batch_size)
+            ).all()
+            if not loans:
+                return total
+            for loan in loans:
+                self.rebuild(loan)
+            self.db.commit()
+            total += len(loans)
+            last_id = loans[-1].id
+            logger.info(f"Repayment schedules rebuilt for {total} loans")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Reconstruire les échéanciers des prêts signés")
+    parser.add_argument("--batch-size", type=int, default=500, help="Prêts par transaction")
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = RepaymentScheduleService(db).rebuild_all(args.batch_size)
+    finally:
+        db.close()
+    print(f"Échéanciers reconstruits: {total} prêts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# ============================
+# backend/app/services/sms_channel.py
+# ============================
+"""
+Canal SMS avec regroupement par numéro de téléphone.
+
+Les SMS d'alerte sont mis en tampon dans Redis (une liste par numéro). Après
+SMS_COALESCE_WINDOW_SECONDS, toutes les alertes en attente pour un même numéro
+sont regroupées en un seul message d'au plus SMS_MAX_SEGMENTS segments facturés,
+puis envoyées par lots via l'interface d'envoi groupé du fournisseur.
+
+La taille d'un segment dépend de l'encodage: GSM-7 (160 caractères, 153 par
+partie d'un message concaténé) si tous les caractères sont dans l'alphabet GSM,
+sinon UCS-2 (70 unités UTF-16, 67 par partie). Les emoji de sévérité imposent
+UCS-2 et comptent pour deux unités.
+"""
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import time
+from app.config import settings
+from app.core.redis_client import get_redis
+from app.services.notification_templates import get_templates
+
+logger = logging.getLogger(__name__)
+
+SMS_PENDING_KEY = "sms:pending"
+SMS_PENDING_PREFIX = "sms:pending:"
+
+# (phone_number, message)
+OutgoingSMS = Tuple[str, str]
+
+# GSM 03.38 default alphabet; the extension table characters take two septets
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+# (single message, part of a concatenated message) capacity by encoding
+SEGMENT_CAPACITY = {"gsm7": (160, 153), "ucs2": (70, 67)}
+
+
+class SMSProvider:
+    """
+    Interface d'envoi groupé, indépendante du fournisseur
+    """
+
+    def send_bulk(self, messages: List[OutgoingSMS]) -> List[bool]:
+        raise NotImplementedError
+
+
+class LoggingSMSProvider(SMSProvider):
+    """
+    Journalise les SMS sans les envoyer (aucun fournisseur configuré)
+    """
+
+    def send_bulk(self, messages: List[OutgoingSMS]) -> List[bool]:
+        for phone_number, message in messages:
+            logger.info(f"📱 SMS notification sent to {phone_number}")
+            logger.info(f"📱 Message: {message}")
+        return [True] * len(messages)
+
+
+class FakeSMSProvider(SMSProvider):
+    """
+    Fournisseur en mémoire pour les tests: conserve les SMS et chaque appel groupé
+    """
+
+    def __init__(self, failing_numbers: Optional[List[str]] = None):
+        self.sent: List[OutgoingSMS] = []
+        self.requests: List[List[OutgoingSMS]] = []
+        self.failing_numbers = set(failing_numbers or [])
+
+    def send_bulk(self, messages: List[OutgoingSMS]) -> List[bool]:
+        self.requests.append(list(messages))
+        results = [phone_number not in self.failing_numbers for phone_number, _ in messages]
+        self.sent += [message for message, ok in zip(messages, results) if ok]
+        return results
+
+
+SMS_PROVIDERS = {
+    "log": LoggingSMSProvider,
+    "fake": FakeSMSProvider,
+}
+
+_provider: Optional[SMSProvider] = None
+
+
+def get_sms_provider() -> SMSProvider:
+    global _provider
+    if _provider is None:
+        _provider = SMS_PROVIDERS[settings.SMS_PROVIDER]()
+    return _provider
+
+
+def sms_encoding(message: str) -> str:
+    return "gsm7" if all(char in GSM7_BASIC or char in GSM7_EXTENDED for char in message) else "ucs2"
+
+
+def sms_length(message: str) -> int:
+    """
+    Longueur en septets (GSM-7) ou en unités UTF-16 (UCS-2)
+    """
+    if sms_encoding(message) == "gsm7":
+        return len(message) + sum(char in GSM7_EXTENDED for char in message)
+    return len(message.encode("utf-16-le")) // 2
+
+
+def sms_segments(message: str) -> int:
+    """
+    Nombre de segments facturés par l'opérateur
+    """
+    single, part = SEGMENT_CAPACITY[sms_encoding(message)]
+    length = sms_length(message)
+    return 1 if length <= single else -(-length // part)
+
+
+def coalesce_messages(items: List[Dict], locale: Optional[str] = None,
+                      max_segments: Optional[int] = None) -> str:
+    """
+    Un seul message pour toutes les alertes d'un numéro, dans la limite de segments
+    (les alertes RED d'abord; celles qui ne tiennent pas sont seulement comptées)
+    """
+    max_segments = max_segments or settings.SMS_MAX_SEGMENTS
+    if len(items) == 1:
+        return _truncate(items[0]["message"], max_segments)
+
+    templates = get_templates(locale or settings.DEFAULT_LANGUAGE)
+    items = sorted(items, key=lambda item: (item["severity"] != "RED", item["alert_id"]))
+    lines: List[str] = []
+
+    def render(more: int) -> str:
+        text = "\n".join(lines)
+        if more:
+            text += "\n" + templates.render("sms_more", more=more)
+        return templates.render("sms_coalesced", count=len(items), lines=text)
+
+    for index, item in enumerate(items):
+        lines.append(item["line"])
+        remaining = len(items) - index - 1
+        if sms_segments(render(remaining)) > max_segments:
+            lines.pop()
+            break
+    return _truncate(render(len(items) - len(lines)), max_segments)
+
+
+def _truncate(message: str, max_segments: int) -> str:
+    if sms_segments(message) <= max_segments:
+        return message
+    # Keep the message encoding: "…" is not in the GSM-7 alphabet
+    ellipsis = "..." if sms_encoding(message) == "gsm7" else "…"
+    single, part = SEGMENT_CAPACITY[sms_encoding(message)]
+    budget = (single if max_segments == 1 else part * max_segments) - sms_length(ellipsis)
+    while sms_length(message) > budget:
+        message = message[:-1]
+    return message + ellipsis
+
+
+class SMSChannel:
+    def __init__(self, provider: Optional[SMSProvider] = None, redis_client=None):
+        self.provider = provider or get_sms_provider()
+        self.redis = redis_client or get_redis()
+
+    def enqueue(self, items: List[list]):
+        """
+        Mettre en attente des items [alert_id, phone_number, message, line, severity]
+        (un seul aller-retour Redis); le délai de regroupement part du premier SMS en attente
+        """
+        if not items:
+            return
+        now = time.time()
+        pipe = self.redis.pipeline()
+        for alert_id, phone_number, message, line, severity in items:
+            pipe.rpush(SMS_PENDING_PREFIX + phone_number, json.dumps({
+                "alert_id": alert_id,
+                "message": message,
+                "line": line,
+                "severity": severity,
+            }))
+            pipe.zadd(SMS_PENDING_KEY, {phone_number: now}, nx=True)
+        pipe.execute()
+
+    def _take_due(self, limit: int) -> Dict[str, List[Dict]]:
+        """
+        Retirer atomiquement les tampons des numéros dont la fenêtre est écoulée
+        """
+        cutoff = time.time() - settings.SMS_COALESCE_WINDOW_SECONDS
+        phone_numbers = self.redis.zrangebyscore(SMS_PENDING_KEY, "-inf", cutoff, start=0, num=limit)
+        if not phone_numbers:
+            return {}
+
+        pipe = self.redis.pipeline()
+        for phone_number in phone_numbers:
+            pipe.lrange(SMS_PENDING_PREFIX + phone_number, 0, -1)
+            pipe.delete(SMS_PENDING_PREFIX + phone_number)
+        pipe.zrem(SMS_PENDING_KEY, *phone_numbers)
+        results = pipe.execute()
+
+        # Numbers already taken by a concurrent flush come back empty
+        return {
+            phone_number: [json.loads(payload) for payload in payloads]
+            for phone_number, payloads in zip(phone_numbers, results[0:-1:2])
+            if payloads
+        }
+
+    def flush(self, limit: Optional[int] = None) -> List[Tuple[List[int], bool]]:
+        """
+        Envoyer un SMS regroupé par numéro dû, par appels groupés de SMS_BULK_SIZE;
+        renvoie (ids des alertes, envoyé) pour chaque SMS
+        """
+        due = self._take_due(limit or settings.SMS_FLUSH_LIMIT)
+        if not due:
+            return []
+
+        outgoing = [(phone_number, coalesce_messages(items)) for phone_number, items in due.items()]
+        alert_ids = [[item["alert_id"] for item in items] for items in due.values()]
+
+        results: List[bool] = []
+        for start in range(0, len(outgoing), settings.SMS_BULK_SIZE):
+            chunk = outgoing[start:start + settings.SMS_BULK_SIZE]
+            try:
+                results += self.provider.send_bulk(chunk)
+            except Exception as e:
+                logger.error(f"Failed to send SMS bulk request: {str(e)}")
+                results += [False] * len(chunk)
+
+        logger.info(
+            f"📱 {sum(results)}/{len(outgoing)} SMS sent for {sum(len(ids) for ids in alert_ids)} alerts"
+        )
+        return list(zip(alert_ids, results))
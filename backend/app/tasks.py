@@ -1,15 +1,34 @@
 # ============================
 # backend/app/tasks.py
 # ============================
-from celery import shared_task
+from typing import List
+from datetime import datetime
+from celery import chord, shared_task
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import SessionLocal
+from app.services.alert_digest import AlertDigest
 from app.services.alert_service import AlertService
+from app.services.loan_import import LoanImporter, iter_rows
+from app.services.notification_dedup import NotificationDeduplicator
+from app.services.notification_delivery import NotificationDeliveryService
+from app.services.notification_outbox import NotificationOutboxDispatcher
 from app.services.notification_service import NotificationService
+from app.services.sms_channel import SMSChannel
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# Sends are deduplicated per (alert, channel): notification tasks can be retried safely
+NOTIFICATION_TASK_OPTIONS = {
+    "autoretry_for": (Exception,),
+    "retry_backoff": True,
+    "retry_backoff_max": settings.NOTIFICATION_TASK_RETRY_BACKOFF_MAX,
+    "retry_jitter": True,
+    "max_retries": settings.NOTIFICATION_TASK_MAX_RETRIES,
+}
+
 @shared_task
 def check_all_alerts():
     """
@@ -19,6 +38,19 @@ def check_all_alerts():
     db = SessionLocal()
     try:
         alert_service = AlertService(db)
+        
+        if settings.ALERT_EVALUATION_MODE == "set" and settings.ALERT_SCAN_SHARDS > 1:
+            # Fan out: one sub-task per shard, counts aggregated by the chord callback
+            shard_count = settings.ALERT_SCAN_SHARDS
+            scan_started_at, watermark = alert_service.begin_scan()
+            watermark = watermark.isoformat() if watermark else None
+            chord(
+                check_alerts_shard.s(shard_index, shard_count, watermark)
+                for shard_index in range(shard_count)
+            )(aggregate_alert_shards.s(scan_started_at.isoformat()))
+            logger.info(f"Alert check dispatched to {shard_count} shards")
+            return f"Alert check dispatched to {shard_count} shards"
+        
         alert_service.check_all_alerts()
         logger.info("Alert check completed successfully")
         return "Alert check completed"
@@ -29,6 +61,56 @@ def check_all_alerts():
         db.close()
 
 @shared_task
+def check_alerts_shard(shard_index: int, shard_count: int, watermark: str = None):
+    """
+    Vérifier les alertes d'une partition du portefeuille
+    """
+    logger.info(f"Starting alert check for shard {shard_index}/{shard_count}")
+    db = SessionLocal()
+    try:
+        alert_service = AlertService(db)
+        return alert_service.check_alerts_shard(
+            shard_index,
+            shard_count,
+            datetime.fromisoformat(watermark) if watermark else None
+        )
+    except Exception as e:
+        logger.error(f"Error in alert check for shard {shard_index}/{shard_count}: {e}")
+        raise
+    finally:
+        db.close()
+
+@shared_task
+def aggregate_alert_shards(counts, scan_started_at: str):
+    """
+    Agréger les résultats des partitions et enregistrer le filigrane du scan
+    """
+    db = SessionLocal()
+    try:
+        if settings.ALERT_INCREMENTAL_SCAN:
+            AlertService(db).finish_scan(datetime.fromisoformat(scan_started_at))
+        total = sum(counts)
+        logger.info(f"Alert check completed successfully: {total} alerts created across {len(counts)} shards")
+        return {"alerts_created": total, "shards": len(counts), "by_shard": counts}
+    finally:
+        db.close()
+
+@shared_task
+def escalate_due_alerts():
+    """
+    Escalader les alertes dont l'échéance d'escalade est passée
+    """
+    db = SessionLocal()
+    try:
+        escalated_ids = AlertService(db).escalate_due_alerts()
+        return {"escalated": len(escalated_ids)}
+    except Exception as e:
+        logger.error(f"Error escalating alerts: {e}")
+        raise
+    finally:
+        db.close()
+
+@shared_task(**NOTIFICATION_TASK_OPTIONS)
 def send_alert_notifications(alert_id: int):
     """
     Envoyer les notifications pour une alerte
@@ -46,6 +128,158 @@ def send_alert_notifications(alert_id: int):
     finally:
         db.close()
 
+@shared_task(**NOTIFICATION_TASK_OPTIONS)
+def send_alert_notifications_batch(alert_ids: List[int]):
+    """
+    Envoyer les notifications d'un lot d'alertes (une seule requête pour le lot)
+    """
+    logger.info(f"Sending notifications for {len(alert_ids)} alerts")
+    db = SessionLocal()
+    try:
+        notification_service = NotificationService(db)
+        results = notification_service.send_alert_notifications_batch(alert_ids)
+        failed = [alert_id for alert_id, result in results.items() if result.get("error")]
+        logger.info(f"Notifications sent for {len(results) - len(failed)} alerts, {len(failed)} failed")
+        return {"sent": len(results) - len(failed), "failed": failed}
+    except Exception as e:
+        logger.error(f"Error sending notifications for alerts {alert_ids}: {e}")
+        raise
+    finally:
+        db.close()
+
+def _send_channel_batch(channel: str, items: List[list]):
+    """
+    Envoyer un paquet [alert_id, *payload] d'un canal
+    """
+    db = SessionLocal()
+    try:
+        notification_service = NotificationService(db)
+        send = getattr(notification_service, f"send_{channel}_batch")
+        results = send(items)
+        failed = [item[0] for item, ok in zip(items, results) if not ok]
+        logger.info(f"{channel}: {len(items) - len(failed)} notifications sent, {len(failed)} failed")
+        return {"sent": len(items) - len(failed), "failed": failed}
+    except Exception as e:
+        logger.error(f"Error sending {channel} notifications: {e}")
+        raise
+    finally:
+        db.close()
+
+@shared_task(**NOTIFICATION_TASK_OPTIONS)
+def send_email_batch(items: List[list]):
+    """
+    Envoyer un paquet d'emails (file email)
+    """
+    return _send_channel_batch("email", items)
+
+@shared_task(**NOTIFICATION_TASK_OPTIONS)
+def send_sms_batch(items: List[list]):
+    """
+    Mettre en attente un paquet de SMS, regroupés par numéro (file sms)
+    """
+    return _send_channel_batch("sms", items)
+
+@shared_task(**NOTIFICATION_TASK_OPTIONS)
+def send_push_batch(items: List[list]):
+    """
+    Envoyer un paquet de notifications push (file push)
+    """
+    return _send_channel_batch("push", items)
+
+CHANNEL_TASKS = {
+    "email": send_email_batch,
+    "sms": send_sms_batch,
+    "push": send_push_batch,
+}
+
+@shared_task
+def flush_sms():
+    """
+    Envoyer un SMS regroupé par numéro dont la fenêtre de regroupement est écoulée
+    """
+    db = SessionLocal()
+    try:
+        results = SMSChannel().flush()
+        NotificationDeliveryService(db).record(
+            "sms", ((alert_id, ok) for alert_ids, ok in results for alert_id in alert_ids)
+        )
+        failed = [alert_ids for alert_ids, ok in results if not ok]
+        # Failed SMS can be sent again by the retry task
+        NotificationDeduplicator().release("sms", (alert_id for alert_ids in failed for alert_id in alert_ids))
+        return {"sent": len(results) - len(failed), "failed": failed}
+    except Exception as e:
+        logger.error(f"Error flushing SMS: {e}")
+        raise
+    finally:
+        db.close()
+
+@shared_task
+def retry_failed_notifications():
+    """
+    Renvoyer les emails et SMS en échec des alertes récentes (seuls les canaux en échec)
+    """
+    db = SessionLocal()
+    try:
+        return NotificationDeliveryService(db).retry_failed()
+    except Exception as e:
+        logger.error(f"Error retrying failed notifications: {e}")
+        raise
+    finally:
+        db.close()
+
+@shared_task
+def flush_alert_digest(agencies: List[str] = None):
+    """
+    Envoyer les récapitulatifs d'alertes en attente (toutes les agences par défaut)
+    """
+    db = SessionLocal()
+    try:
+        return AlertDigest(db).flush(agencies)
+    except Exception as e:
+        logger.error(f"Error flushing alert digest: {e}")
+        raise
+    finally:
+        db.close()
+
+@shared_task
+def dispatch_notification_outbox():
+    """
+    Envoyer les notifications en attente dans l'outbox (plusieurs instances
+    peuvent tourner en parallèle)
+    """
+    db = SessionLocal()
+    try:
+        return NotificationOutboxDispatcher(db).dispatch()
+    except Exception as e:
+        logger.error(f"Error dispatching notification outbox: {e}")
+        raise
+    finally:
+        db.close()
+
+# Not idempotent: chunks are committed as the file is read, a redelivered job
+# would import them again. A job lost with its worker is not replayed.
+@shared_task(bind=True, acks_late=False, reject_on_worker_lost=False)
+def import_loans(self, path: str, agency_code: str = None):
+    """
+    Importer un fichier de prêts déposé par l'API (progression dans l'état de la tâche)
+    """
+    logger.info(f"Importing loans from {path}")
+    db = SessionLocal()
+    try:
+        importer = LoanImporter(
+            db,
+            agency_code=agency_code,
+            progress=lambda progress: self.update_state(state="PROGRESS", meta=progress)
+        )
+        return importer.run(iter_rows(path))
+    except Exception as e:
+        logger.error(f"Error importing loans from {path}: {e}")
+        raise
+    finally:
+        db.close()
+        if os.path.exists(path):
+            os.remove(path)
+
 @shared_task
 def send_daily_report():
     """
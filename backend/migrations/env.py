@@ -9,7 +9,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 # Import your models
-from app.models import client, loan, disbursement, document, alert
+from app.models import client, loan, disbursement, document, alert, notification
 from app.database import Base
 
 # this is the Alembic Config object, which provides
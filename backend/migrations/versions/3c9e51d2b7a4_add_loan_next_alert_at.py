@@ -0,0 +1,26 @@
+"""Add loans.next_alert_at for incremental alert scans
+
+Revision ID: 3c9e51d2b7a4
+Revises: a76bd911c7b3
+Create Date: 2025-07-02 09:14:37.201845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e51d2b7a4'
+down_revision = 'a76bd911c7b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('loans', sa.Column('next_alert_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_loans_next_alert_at'), 'loans', ['next_alert_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_loans_next_alert_at'), table_name='loans')
+    op.drop_column('loans', 'next_alert_at')
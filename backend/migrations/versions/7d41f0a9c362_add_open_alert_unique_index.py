@@ -0,0 +1,40 @@
+"""Add partial unique index on open alerts
+
+Revision ID: 7d41f0a9c362
+Revises: 3c9e51d2b7a4
+Create Date: 2025-07-03 10:42:18.664102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d41f0a9c362'
+down_revision = '3c9e51d2b7a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Resolve older duplicates so the unique index can be built
+    op.execute("""
+        UPDATE alerts SET status = 'RESOLVED', resolved_at = now()
+        WHERE status <> 'RESOLVED'
+          AND id NOT IN (
+              SELECT max(id) FROM alerts
+              WHERE status <> 'RESOLVED'
+              GROUP BY loan_id, alert_type
+          )
+    """)
+    op.create_index(
+        'uq_alerts_open_loan_type',
+        'alerts',
+        ['loan_id', 'alert_type'],
+        unique=True,
+        postgresql_where=sa.text("status <> 'RESOLVED'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_alerts_open_loan_type', table_name='alerts')
@@ -0,0 +1,34 @@
+"""Index the change markers read by the incremental alert scan
+
+Revision ID: a3d5e8f1c962
+Revises: f4a09c3e7b21
+Create Date: 2025-07-16 10:21:53.408117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d5e8f1c962'
+down_revision = 'f4a09c3e7b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_loans_created_at'), 'loans', ['created_at'], unique=False)
+    op.create_index(op.f('ix_loans_updated_at'), 'loans', ['updated_at'], unique=False)
+    op.create_index(op.f('ix_disbursements_loan_id'), 'disbursements', ['loan_id'], unique=False)
+    op.create_index(op.f('ix_disbursements_created_at'), 'disbursements', ['created_at'], unique=False)
+    op.create_index(op.f('ix_disbursements_updated_at'), 'disbursements', ['updated_at'], unique=False)
+    op.create_index(op.f('ix_alerts_resolved_at'), 'alerts', ['resolved_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_alerts_resolved_at'), table_name='alerts')
+    op.drop_index(op.f('ix_disbursements_updated_at'), table_name='disbursements')
+    op.drop_index(op.f('ix_disbursements_created_at'), table_name='disbursements')
+    op.drop_index(op.f('ix_disbursements_loan_id'), table_name='disbursements')
+    op.drop_index(op.f('ix_loans_updated_at'), table_name='loans')
+    op.drop_index(op.f('ix_loans_created_at'), table_name='loans')
@@ -0,0 +1,27 @@
+"""Add users.agency_code (agency code of the loan numbers)
+
+Revision ID: b7e2c4d9a815
+Revises: a3d5e8f1c962
+Create Date: 2025-07-18 11:42:06.519384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c4d9a815'
+down_revision = 'a3d5e8f1c962'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NULL: the user belongs to the default agency (settings.LOAN_AGENCY_CODE)
+    op.add_column('users', sa.Column('agency_code', sa.String(length=10), nullable=True))
+    op.create_index(op.f('ix_users_agency_code'), 'users', ['agency_code'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_agency_code'), table_name='users')
+    op.drop_column('users', 'agency_code')
@@ -0,0 +1,33 @@
+"""Add notification_preferences table
+
+Revision ID: d8f3a26c4e15
+Revises: b52e8c7f1a93
+Create Date: 2025-07-10 09:42:17.084312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f3a26c4e15'
+down_revision = 'b52e8c7f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_preferences',
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('sms', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('push', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('client_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('notification_preferences')
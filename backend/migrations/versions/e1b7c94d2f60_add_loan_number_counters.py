@@ -0,0 +1,42 @@
+"""Add loan_number_counters table
+
+Revision ID: e1b7c94d2f60
+Revises: d8f3a26c4e15
+Create Date: 2025-07-11 10:18:44.512903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b7c94d2f60'
+down_revision = 'd8f3a26c4e15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'loan_number_counters',
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('agency_code', sa.String(length=10), nullable=False),
+        sa.Column('last_value', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('year', 'agency_code')
+    )
+    # Start each counter after the highest sequence already used (YYYY/AGENCY/SEQUENCE/TYPE)
+    op.execute(
+        """
+        INSERT INTO loan_number_counters (year, agency_code, last_value)
+        SELECT split_part(loan_number, '/', 1)::integer,
+               split_part(loan_number, '/', 2),
+               max(split_part(loan_number, '/', 3)::bigint)
+        FROM loans
+        WHERE loan_number ~ '^[0-9]{4}/[^/]{1,10}/[0-9]+/'
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('loan_number_counters')
@@ -0,0 +1,40 @@
+"""Add repayment_schedule table
+
+Revision ID: f4a09c3e7b21
+Revises: e1b7c94d2f60
+Create Date: 2025-07-14 16:02:39.771845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a09c3e7b21'
+down_revision = 'e1b7c94d2f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'repayment_schedule',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('loan_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.Integer(), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('payment', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('interest', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('principal', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('balance', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['loan_id'], ['loans.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('loan_id', 'period', name='uq_repayment_schedule_loan_period')
+    )
+    op.create_index('ix_repayment_schedule_due_date', 'repayment_schedule', ['due_date'], unique=False)
+    # Schedules of loans signed before this revision: make rebuild-schedules
+
+
+def downgrade() -> None:
+    op.drop_index('ix_repayment_schedule_due_date', table_name='repayment_schedule')
+    op.drop_table('repayment_schedule')
@@ -0,0 +1,51 @@
+# ============================
+# backend/tests/conftest.py
+# ============================
+import fakeredis
+import pytest
+
+
+@pytest.fixture
+def redis_client():
+    """
+    Redis en mémoire (même réglage decode_responses que get_redis)
+    """
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def db_session():
+    """
+    Base SQLite en mémoire avec le schéma des modèles (une connexion partagée)
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.models  # noqa: F401 (register the tables)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def api_client(db_session):
+    """
+    Routes des prêts sans le cycle de vie de l'application (Redis, limiteur)
+    """
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.deps import get_current_user, get_db
+    from app.api.v1.endpoints import loans
+    from app.models import User
+
+    app = FastAPI()
+    app.include_router(loans.router, prefix="/loans")
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, is_active=True)
+    with TestClient(app) as client:
+        yield client
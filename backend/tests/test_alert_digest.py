@@ -0,0 +1,116 @@
+# ============================
+# backend/tests/test_alert_digest.py
+# ============================
+import pytest
+from app.config import settings
+from app.models import User, UserRole
+from app.services.alert_digest import AlertDigest
+from app.services.notification_service import NotificationService
+
+
+def make_item(alert_id, status="PENDING", agency="102"):
+    return {
+        "alert_id": alert_id,
+        "alert_type": "WORK_DELAY_CRITICAL",
+        "severity": "RED",
+        "status": status,
+        "message": f"Alerte {alert_id}",
+        "loan_id": alert_id,
+        "loan_number": f"2025/{agency}/{alert_id:07d}/541",
+        "client_name": "Client",
+        "client_phone": None,
+    }
+
+
+@pytest.fixture
+def users(db_session, monkeypatch):
+    """
+    Destinataires des agences 102 (agence par défaut) et 205
+    """
+    monkeypatch.setattr(settings, "LOAN_AGENCY_CODE", "102")
+    db_session.add_all([
+        User(username=username, email=f"{username}@example.com", full_name=username, hashed_password="-",
+             role=role, agency=agency, agency_code=agency_code, is_active=active, preferred_language=language)
+        for username, role, agency, agency_code, active, language in [
+            ("directeur", UserRole.DIRECTEUR_AGENCE, "Yaoundé Centre", "102", True, "fr"),
+            ("admin", UserRole.ADMIN, "Siège", None, True, "en"),
+            ("ancien", UserRole.DIRECTEUR_AGENCE, "Yaoundé Centre", "102", False, "fr"),
+            ("charge", UserRole.CHARGE_CLIENTELE, "Yaoundé Centre", "102", True, "fr"),
+            ("douala", UserRole.DIRECTEUR_AGENCE, "Douala Akwa", "205", True, "fr"),
+        ]
+    ])
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    """
+    Emails envoyés par destinataire; les adresses de failing échouent
+    """
+    sent = {}
+    failing = set()
+
+    def send_email_notifications(self, emails):
+        for email, subject, message in emails:
+            if email not in failing:
+                sent.setdefault(email, []).append(message)
+        return [email not in failing for email, _, _ in emails]
+
+    monkeypatch.setattr(NotificationService, "send_email_notifications", send_email_notifications)
+    return sent, failing
+
+
+def test_recipients_are_matched_on_the_loan_number_agency_code(users, redis_client):
+    digest = AlertDigest(users, redis_client)
+
+    assert digest._recipients(["102", "205", "307"]) == {
+        "102": {"fr": ["directeur@example.com"], "en": ["admin@example.com"]},
+        "205": {"fr": ["douala@example.com"]},
+    }
+
+
+def test_digest_goes_to_the_agency_recipients(users, redis_client, outbox):
+    sent, _ = outbox
+    digest = AlertDigest(users, redis_client)
+    digest.add([make_item(1), make_item(2, agency="205"), make_item(3, agency="307")])
+
+    assert digest.flush() == {"102": 1, "205": 1, "307": 1}
+    assert set(sent) == {
+        "directeur@example.com", "admin@example.com", "douala@example.com",
+        settings.ALERT_DIGEST_FALLBACK_EMAIL,
+    }
+    assert "Alerte 2" in sent["douala@example.com"][0]
+    assert "Alerte 3" in sent[settings.ALERT_DIGEST_FALLBACK_EMAIL][0]
+
+
+def test_failed_recipient_gets_requeued_items_without_resending_to_others(users, redis_client, outbox):
+    sent, failing = outbox
+    digest = AlertDigest(users, redis_client)
+    digest.add([make_item(1), make_item(2)])
+
+    failing.add("admin@example.com")
+    assert digest.flush() == {"102": 0}
+    assert len(sent["directeur@example.com"]) == 1
+
+    failing.clear()
+    digest.add([make_item(3)])
+    assert digest.flush() == {"102": 3}
+
+    # The director only gets the new item, the admin gets the three
+    assert "Alerte 1" not in sent["directeur@example.com"][1]
+    assert "Alerte 3" in sent["directeur@example.com"][1]
+    assert all(f"Alerte {alert_id}" in sent["admin@example.com"][0] for alert_id in (1, 2, 3))
+    assert digest.flush() == {}
+
+
+def test_escalation_of_a_delivered_alert_is_a_new_item(users, redis_client, outbox):
+    sent, _ = outbox
+    digest = AlertDigest(users, redis_client)
+
+    digest.add([make_item(1)])
+    digest.flush()
+    digest.add([make_item(1, status="ESCALATED")])
+    digest.flush()
+
+    assert len(sent["directeur@example.com"]) == 2
@@ -0,0 +1,102 @@
+# ============================
+# backend/tests/test_amortization.py
+# ============================
+from decimal import Decimal
+import pytest
+from app.services.amortization import exact_schedule, preview_lines, schedule_totals
+
+def cents(value) -> int:
+    """
+    Écart en centimes (sans le bruit de l'arithmétique float)
+    """
+    return round(abs(float(value)) * 100)
+
+
+LOANS = [
+    # amount, annual rate, duration, grace
+    (Decimal("25000000"), Decimal("7.50"), 240, 6),
+    (Decimal("1000000"), Decimal("5.00"), 24, 0),
+    (Decimal("12345.67"), Decimal("9.25"), 7, 2),
+    (Decimal("12345.67"), Decimal("0"), 12, 2),
+]
+
+
+@pytest.mark.parametrize("amount, rate, duration, grace", LOANS)
+def test_exact_schedule_repays_the_principal(amount, rate, duration, grace):
+    lines = exact_schedule(amount, rate, duration, grace)
+
+    assert len(lines) == grace + duration
+    assert sum(line["principal"] for line in lines) == amount
+    assert lines[-1]["balance"] == 0
+    assert all(line["payment"] == line["principal"] + line["interest"] for line in lines)
+    assert all(line[name] == line[name].quantize(Decimal("0.01")) for line in lines
+               for name in ("payment", "interest", "principal", "balance"))
+
+
+@pytest.mark.parametrize("amount, rate, duration, grace", LOANS)
+def test_last_installment_absorbs_rounding(amount, rate, duration, grace):
+    lines = exact_schedule(amount, rate, duration, grace)
+    installments = {line["payment"] for line in lines[grace:-1]}
+
+    # Constant rounded installment, only the last one differs
+    assert len(installments) <= 1
+    if installments:
+        assert abs(lines[-1]["payment"] - installments.pop()) < Decimal("0.01") * duration
+
+
+@pytest.mark.parametrize("amount, rate, duration, grace", LOANS)
+def test_grace_months_are_interest_only(amount, rate, duration, grace):
+    lines = exact_schedule(amount, rate, duration, grace)
+
+    for line in lines[:grace]:
+        assert line["principal"] == 0
+        assert line["balance"] == amount
+        assert line["payment"] == line["interest"]
+    if duration:
+        assert lines[grace]["principal"] > 0
+
+
+def rounding_drift(rate, duration) -> float:
+    """
+    Écart maximal accumulé par l'arrondi mensuel des intérêts du tableau exact
+    (un demi-centime par mois, capitalisé), que l'aperçu float n'arrondit pas
+    """
+    monthly = float(rate) / 100 / 12
+    if monthly == 0:
+        return 0.0
+    return 0.005 * ((1 + monthly) ** duration - 1) / monthly
+
+
+@pytest.mark.parametrize("amount, rate, duration, grace", LOANS)
+def test_preview_installments_match_exact_schedule(amount, rate, duration, grace):
+    exact = exact_schedule(amount, rate, duration, grace)
+    preview = preview_lines(amount, rate, duration, grace)
+
+    assert [line["period"] for line in preview] == [line["period"] for line in exact]
+    # Same cent-rounded installment (and grace interest) on every line but the last
+    for exact_line, preview_line in zip(exact[:-1], preview[:-1]):
+        assert cents(float(exact_line["payment"]) - preview_line["payment"]) == 0, exact_line["period"]
+    assert preview[-1]["balance"] == 0
+
+
+@pytest.mark.parametrize("amount, rate, duration, grace", LOANS[1:])
+def test_preview_matches_exact_schedule_within_a_cent(amount, rate, duration, grace):
+    exact = exact_schedule(amount, rate, duration, grace)
+    preview = preview_lines(amount, rate, duration, grace)
+
+    for exact_line, preview_line in zip(exact, preview):
+        for name in ("payment", "interest", "principal", "balance"):
+            assert cents(float(exact_line[name]) - preview_line[name]) <= 1, (exact_line["period"], name)
+    totals = schedule_totals(exact), schedule_totals(preview)
+    assert cents(float(totals[0]["total_paid"]) - totals[1]["total_paid"]) <= 1
+
+
+@pytest.mark.parametrize("amount, rate, duration, grace", LOANS)
+def test_preview_drift_is_bounded_by_interest_rounding(amount, rate, duration, grace):
+    exact = exact_schedule(amount, rate, duration, grace)
+    preview = preview_lines(amount, rate, duration, grace)
+    bound = rounding_drift(rate, duration) + 0.01
+
+    for exact_line, preview_line in zip(exact, preview):
+        for name in ("payment", "interest", "principal", "balance"):
+            assert abs(float(exact_line[name]) - preview_line[name]) <= bound, (exact_line["period"], name)
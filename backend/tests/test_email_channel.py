@@ -0,0 +1,114 @@
+# ============================
+# backend/tests/test_email_channel.py
+# ============================
+import socket
+import pytest
+from aiosmtpd.controller import Controller
+from app.config import settings
+from app.services import email_channel
+from app.services.email_channel import EmailChannel, SMTPConnectionPool
+
+
+class RecordingHandler:
+    """
+    Serveur SMTP de test: conserve les messages et la connexion de chacun
+    """
+
+    def __init__(self, rejected=()):
+        self.messages = []
+        self.servers = []
+        self.rejected = set(rejected)
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rejected:
+            return "550 Mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((session.peer, envelope.rcpt_tos[0]))
+        if server not in self.servers:
+            self.servers.append(server)
+        return "250 Message accepted"
+
+    @property
+    def connections(self):
+        return {peer for peer, _ in self.messages}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler(rejected=["bounce@example.com"])
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+@pytest.fixture
+def channel(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "alertes@example.com")
+    pool = SMTPConnectionPool(size=2, hostname=smtp_server.hostname, port=smtp_server.port, start_tls=False)
+    channel = EmailChannel(pool)
+    yield channel
+    channel.close()
+
+
+def emails(*recipients):
+    return [(recipient, "Alerte", "Corps du message") for recipient in recipients]
+
+
+def test_batch_reuses_pooled_connections(channel, smtp_server):
+    recipients = [f"agent{index}@example.com" for index in range(10)]
+
+    assert channel.send_many(emails(*recipients)) == [True] * 10
+    assert channel.send_many(emails(*recipients)) == [True] * 10
+
+    handler = smtp_server.handler
+    assert sorted(rcpt for _, rcpt in handler.messages) == sorted(recipients * 2)
+    # Twenty messages over at most SMTP pool size connections
+    assert len(handler.connections) <= 2
+
+
+def test_batch_results_map_to_each_email(channel, smtp_server):
+    results = channel.send_many(emails("a@example.com", "bounce@example.com", "b@example.com"))
+
+    assert results == [True, False, True]
+    assert sorted(rcpt for _, rcpt in smtp_server.handler.messages) == ["a@example.com", "b@example.com"]
+
+
+def test_reconnects_after_server_drops_connection(channel, smtp_server):
+    assert channel.send("a@example.com", "Alerte", "Corps")
+    handler = smtp_server.handler
+    first_connections = set(handler.connections)
+
+    # The server closes every idle connection, as after its idle timeout
+    for server in handler.servers:
+        smtp_server.loop.call_soon_threadsafe(server.transport.close)
+
+    assert channel.send_many(emails("b@example.com", "c@example.com")) == [True, True]
+    assert handler.connections - first_connections
+
+
+def test_channel_is_recreated_after_fork(monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_channel, "_channel", None)
+    monkeypatch.setattr(email_channel, "_channel_pid", None)
+    monkeypatch.setattr(email_channel.os, "getpid", lambda: 1000)
+
+    parent = email_channel.get_email_channel()
+    assert email_channel.get_email_channel() is parent
+
+    monkeypatch.setattr(email_channel.os, "getpid", lambda: 1001)
+    child = email_channel.get_email_channel()
+    assert child is not parent
+    assert child._loop is not parent._loop
+
+    parent.close()
+    child.close()
@@ -0,0 +1,62 @@
+# ============================
+# backend/tests/test_loans_api.py
+# ============================
+from decimal import Decimal
+from app.services.amortization import exact_schedule, schedule_totals
+from tests.test_amortization import rounding_drift
+
+
+def test_schedule_of_unknown_loan_is_404(api_client):
+    response = api_client.get("/loans/999/schedule")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Loan not found"
+
+
+def test_exact_schedule_of_unknown_loan_is_404(api_client):
+    assert api_client.get("/loans/999/schedule", params={"exact": True}).status_code == 404
+
+
+def test_simulation_prices_an_interest_free_loan(api_client):
+    response = api_client.post("/loans/simulate", json={"scenarios": [
+        {"loan_type": "PRET_CLASSIQUE_ACQUEREUR", "amount": "1200000", "interest_rate": "0", "duration_months": 12},
+    ]})
+
+    assert response.status_code == 200
+    result = response.json()["results"][0]
+    assert result["monthly_payment"] == 100000
+    assert result["total_paid"] == 1200000
+    assert result["total_interest"] == 0
+
+
+def test_simulation_rejects_a_negative_rate(api_client):
+    response = api_client.post("/loans/simulate", json={"scenarios": [
+        {"loan_type": "PRET_CLASSIQUE_ACQUEREUR", "amount": "1200000", "interest_rate": "-1", "duration_months": 12},
+    ]})
+
+    assert response.status_code == 422
+
+
+def test_simulation_totals_match_exact_schedules(api_client):
+    scenarios = [
+        ("PRET_CLASSIQUE_ACQUEREUR", Decimal("25000000"), Decimal("7.50"), 240, 6),
+        ("PRET_CLASSIQUE_CONSTRUCTEUR", Decimal("1000000"), Decimal("5.00"), 24, 0),
+        ("PRET_LOCATIF_ORDINAIRE", Decimal("12345.67"), Decimal("9.25"), 7, 2),
+        ("FONCIER_CLASSIQUE_JEUNES", Decimal("12345.67"), Decimal("0"), 12, 2),
+        ("PRET_CLASSIQUE_ACQUEREUR", Decimal("750000"), Decimal("11.90"), 1, 0),
+    ]
+    response = api_client.post("/loans/simulate", json={"scenarios": [
+        {"loan_type": loan_type, "amount": str(amount), "interest_rate": str(rate),
+         "duration_months": duration, "grace_period_months": grace}
+        for loan_type, amount, rate, duration, grace in scenarios
+    ]})
+
+    assert response.status_code == 200
+    for (_, amount, rate, duration, grace), result in zip(scenarios, response.json()["results"]):
+        lines = exact_schedule(amount, rate, duration, grace)
+        totals = schedule_totals(lines)
+        # Vectorised float pricing vs Decimal schedule with monthly interest rounding
+        tolerance = rounding_drift(rate, duration) + 0.01
+        assert result["monthly_payment"] == float(lines[grace]["payment"])
+        assert abs(result["total_paid"] - float(totals["total_paid"])) <= tolerance
+        assert abs(result["total_interest"] - float(totals["total_interest"])) <= tolerance
@@ -0,0 +1,75 @@
+# ============================
+# backend/tests/test_sms_channel.py
+# ============================
+import pytest
+from app.config import settings
+from app.services.sms_channel import (
+    FakeSMSProvider,
+    SMSChannel,
+    coalesce_messages,
+    sms_encoding,
+    sms_length,
+    sms_segments,
+)
+
+
+def make_items(count, line_length=60):
+    items = []
+    for alert_id in range(1, count + 1):
+        severity = "RED" if alert_id % 3 == 0 else "ORANGE"
+        icon = "🔴" if severity == "RED" else "🟠"
+        line = f"{icon} #2025/102/{alert_id:07d}/541: " + "Délai de déblocage dépassé"[:line_length]
+        items.append({"alert_id": alert_id, "severity": severity, "message": line, "line": line})
+    return items
+
+
+def test_segment_count_follows_encoding():
+    assert sms_encoding("Prêt signé") == "ucs2"  # ê is not in the GSM-7 alphabet
+    assert sms_encoding("Echeance depassee, contactez votre conseiller") == "gsm7"
+    assert sms_segments("a" * 160) == 1
+    assert sms_segments("a" * 161) == 2
+    assert sms_segments("€" * 80) == 1  # extension table: two septets each
+    assert sms_segments("€" * 81) == 2
+    assert sms_segments("é" * 70) == 1
+    assert sms_segments("🔴" + "ê" * 69) == 2  # the emoji is a surrogate pair
+    assert sms_length("🔴") == 2
+
+
+@pytest.mark.parametrize("count", [1, 2, 5, 40])
+@pytest.mark.parametrize("max_segments", [1, 2, 3])
+def test_coalesced_message_stays_within_segment_budget(count, max_segments):
+    message = coalesce_messages(make_items(count), "fr", max_segments)
+    assert sms_segments(message) <= max_segments
+
+
+def test_coalesced_message_lists_red_alerts_first_and_counts_the_rest():
+    message = coalesce_messages(make_items(40), "fr", 3)
+    lines = message.split("\n")
+    assert lines[1].startswith("🔴")
+    assert "(+" in message
+
+
+def test_long_single_alert_is_truncated_to_budget():
+    message = "🔴 " + "x" * 500
+    truncated = coalesce_messages([{"alert_id": 1, "severity": "RED", "message": message, "line": message}], "fr", 2)
+    assert sms_segments(truncated) == 2
+    assert truncated.endswith("…")
+
+
+def test_flush_sends_one_sms_per_phone_number(redis_client, monkeypatch):
+    monkeypatch.setattr(settings, "SMS_COALESCE_WINDOW_SECONDS", 0)
+    provider = FakeSMSProvider(failing_numbers=["+237600000002"])
+    channel = SMSChannel(provider, redis_client)
+    channel.enqueue([
+        [alert_id, phone, item["message"], item["line"], item["severity"]]
+        for phone, items in (("+237600000001", make_items(6)), ("+237600000002", make_items(2)))
+        for alert_id, item in ((item["alert_id"] + (100 if phone.endswith("2") else 0), item) for item in items)
+    ])
+
+    results = dict((tuple(ids), ok) for ids, ok in channel.flush())
+
+    assert len(provider.requests) == 1
+    assert [phone for phone, _ in provider.sent] == ["+237600000001"]
+    assert all(sms_segments(message) <= settings.SMS_MAX_SEGMENTS for _, message in provider.sent)
+    assert results == {(1, 2, 3, 4, 5, 6): True, (101, 102): False}
+    assert channel.flush() == []